@@ -2,7 +2,7 @@
 Pydantic Models for API Request/Response
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 
 class QueryRequest(BaseModel):
     query: str = Field(..., description="SQL query to analyze")
@@ -16,6 +16,19 @@ class DetectionResponse(BaseModel):
     normalized_query: str
     original_query: str
     response_time_ms: float
+    fingerprint: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest] = Field(
+        ..., min_length=1, max_length=10000,
+        description="Queries to analyze in a single call"
+    )
+
+class BatchDetectionResponse(BaseModel):
+    results: List[DetectionResponse]
+    total: int
+    malicious_count: int
+    response_time_ms: float
 
 class VulnerableQueryRequest(BaseModel):
     user_id: str = Field(..., description="User ID for vulnerable query")
@@ -31,6 +44,14 @@ class AttackRecord(BaseModel):
     source_ip: Optional[str]
     user_agent: Optional[str]
     response_time_ms: Optional[float]
+    fingerprint: Optional[str] = None
+
+class FingerprintStats(BaseModel):
+    fingerprint: str
+    count: int
+    malicious_count: int
+    first_seen: str
+    last_seen: str
 
 class Statistics(BaseModel):
     total_queries: int
@@ -40,3 +61,97 @@ class Statistics(BaseModel):
     average_confidence: float
     attack_type_distribution: dict
 
+
+class CacheStatistics(BaseModel):
+    # 'local': the API process's cache; 'workers': summed over process-pool
+    # workers, whose size, evictions and expirations are not collected
+    scope: str = 'local'
+    size: Optional[int] = None
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: Optional[int] = None
+    expirations: Optional[int] = None
+    invalidations: int
+
+class ExecutorStatistics(BaseModel):
+    mode: str
+    max_workers: int
+    max_queue: int
+    in_flight: int
+    queue_depth: int
+    peak_in_flight: int
+    completed: int
+    rejected: int
+    failed: int
+
+class WriteStatistics(BaseModel):
+    write_mode: str
+    buffered: int
+    buffer_size: int
+    enqueued: int
+    written: int
+    dropped: int
+    failed: int
+    batches: int
+
+class PartitionInfo(BaseModel):
+    day: str
+    first_id: int
+    last_id: int
+    row_count: int
+    malicious_count: int
+    state: str
+    archive_path: Optional[str] = None
+    archive_bytes: Optional[int] = None
+    retired_at: str
+
+class RetentionStatistics(BaseModel):
+    retention_days: int
+    mode: str
+    archive_dir: str
+    interval_seconds: float
+    runs: int
+    partitions_retired: int
+    rows_retired: int
+    last_run_at: Optional[float] = None
+    partitions: List[PartitionInfo]
+
+class BroadcastStatistics(BaseModel):
+    clients: int
+    queue_size: int
+    events: int
+    queued: int
+    sent: int
+    dropped: int
+    evicted: int
+    filtered: int
+
+class WebSocketSubscription(BaseModel):
+    """Sent over /api/ws as {"type": "subscribe", ...}; omitted fields match everything"""
+    topics: List[Literal['attacks', 'stats']] = Field(default_factory=lambda: ['attacks', 'stats'])
+    attack_types: Optional[List[str]] = Field(None, description="Only these attack types")
+    min_confidence: float = Field(0.0, ge=0.0, le=1.0)
+    source_ip_prefix: str = Field('', description="e.g. '10.0.' for 10.0.0.0/16")
+    sample_rate: float = Field(1.0, gt=0.0, le=1.0, description="Fraction of matching events to send")
+
+class ModelVersion(BaseModel):
+    version: str
+    path: str
+    spec_hash: Optional[str] = None
+    mtime: float
+    loaded_at: float
+    warmup_ms: Optional[float] = None
+    attack_type_head: bool = False
+
+class ModelStatus(BaseModel):
+    active: Optional[ModelVersion] = None
+    history: List[ModelVersion]
+    reloads: int
+    rollbacks: int
+    failures: int
+
+class ModelReloadRequest(BaseModel):
+    path: Optional[str] = Field(None, description="Model file under app/models (default: the current one)")
@@ -2,52 +2,115 @@
 API Routes for SQL Injection Detection
 """
 import time
-import numpy as np
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from typing import List
+from pydantic import ValidationError
+from fastapi import APIRouter, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Literal, Optional
 import json
+from pathlib import Path
 
 from .models import (
     QueryRequest, DetectionResponse, VulnerableQueryRequest,
-    AttackRecord, Statistics
+    AttackRecord, Statistics, BatchQueryRequest, BatchDetectionResponse,
+    CacheStatistics, FingerprintStats, ExecutorStatistics, WriteStatistics,
+    RetentionStatistics, BroadcastStatistics, WebSocketSubscription,
+    ModelStatus, ModelReloadRequest
 )
 from ..services.normalizer import QueryNormalizer
 from ..services.feature_extractor import FeatureExtractor
 from ..services.ml_detector import MLDetector
 from ..services.knowledge_base import KnowledgeBase
+from ..services.verdict_cache import VerdictCache
+from ..services.pipeline import DetectionPipeline
+from ..services.executor import DetectionExecutor, ExecutorSaturated
+from ..services.retention import RetentionManager
+from ..services.broadcaster import Broadcaster
+from ..services.live_stats import LiveStatsPublisher
+from ..services.model_registry import ModelRegistry
+from ..services.control import ControlChannel
 from ..database.schema import Database
+from .. import config, startup
+
+# Prefer the memory-mapped compiled artifact; older model files still load
+MODEL_PATHS = [
+    'app/models/rf_detector.forest',
+    'app/models/rf_detector.npz',
+    'app/models/rf_detector.pkl',
+]
+MODEL_PATH = next((path for path in MODEL_PATHS if Path(path).exists()), MODEL_PATHS[0])
 
 # Initialize services
 normalizer = QueryNormalizer()
 feature_extractor = FeatureExtractor()
-ml_detector = MLDetector(model_path='app/models/rf_detector.pkl')
-database = Database()
-knowledge_base = KnowledgeBase(database)
+with startup.phase('model load'):
+    ml_detector = MLDetector(model_path=MODEL_PATH)
+verdict_cache = VerdictCache(
+    max_size=config.VERDICT_CACHE_SIZE,
+    ttl_seconds=config.VERDICT_CACHE_TTL_SECONDS
+)
+ml_detector.add_reload_listener(verdict_cache.invalidate)
+pipeline = DetectionPipeline(normalizer, feature_extractor, ml_detector, verdict_cache)
+detection_executor = DetectionExecutor(
+    pipeline,
+    mode=config.DETECTION_EXECUTOR,
+    max_workers=config.DETECTION_WORKERS or None,
+    max_queue=config.DETECTION_QUEUE_SIZE,
+    model_path=MODEL_PATH
+)
+with startup.phase('model registry'):
+    model_registry = ModelRegistry(
+        ml_detector,
+        feature_extractor,
+        executor=detection_executor,
+        model_path=MODEL_PATH,
+        watch_interval=config.MODEL_WATCH_INTERVAL_SECONDS
+    )
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-    
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-    
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+# serve.py workers forward admin actions to each other through this
+control = ControlChannel()
+# Peers re-read the file, so reloads and rollbacks name the version they expect
+control.register('model_reload', lambda entry: model_registry.reload(entry['path'], entry['version']))
+control.register('model_rollback', lambda entry: model_registry.rollback(entry['version']))
+control.register('cache_clear', lambda entry: verdict_cache.invalidate())
+
+database = Database()
+knowledge_base = KnowledgeBase(
+    database,
+    write_mode=config.KB_WRITE_MODE,
+    buffer_size=config.KB_WRITE_BUFFER_SIZE,
+    batch_size=config.KB_WRITE_BATCH_SIZE,
+    flush_interval=config.KB_FLUSH_INTERVAL_SECONDS
+)
+retention = RetentionManager(
+    database,
+    retention_days=config.RETENTION_DAYS,
+    mode=config.RETENTION_MODE,
+    archive_dir=config.ARCHIVE_DIR,
+    interval_seconds=config.RETENTION_INTERVAL_SECONDS
+)
 
-manager = ConnectionManager()
+# WebSocket fan-out (never blocks the request that publishes)
+manager = Broadcaster(
+    queue_size=config.WS_QUEUE_SIZE,
+    send_timeout=config.WS_SEND_TIMEOUT_SECONDS,
+    max_dropped=config.WS_MAX_DROPPED
+)
+live_stats = LiveStatsPublisher(
+    knowledge_base,
+    manager,
+    interval_seconds=config.LIVE_STATS_INTERVAL_SECONDS
+)
 
 # Create router
 router = APIRouter()
 
+# Largest page /api/attacks returns (/api/attacks/export streams any size)
+MAX_ATTACKS_PAGE = 1000
+
+def _saturated(error: ExecutorSaturated) -> HTTPException:
+    """429 with a retry hint when the detection pool is full"""
+    return HTTPException(status_code=429, detail=str(error), headers={'Retry-After': '1'})
+
 @router.post("/detect", response_model=DetectionResponse)
 async def detect_sql_injection(request: QueryRequest):
     """
@@ -56,20 +119,14 @@ async def detect_sql_injection(request: QueryRequest):
     start_time = time.time()
     
     try:
-        # Step 1: Normalize query
-        normalized = normalizer.normalize(request.query)
-        
-        # Step 2: Extract features
-        features = feature_extractor.extract_as_array(normalized)
-        features_array = np.array(features)
-        
-        # Step 3: ML Detection
-        is_malicious, confidence = ml_detector.predict(features_array)
-        
-        # Step 4: Identify attack type if malicious
-        attack_type = None
-        if is_malicious:
-            attack_type = ml_detector.identify_attack_type(normalized)
+        # Steps 1-4: Normalize, extract features, detect and classify
+        # on the worker pool so the event loop stays responsive
+        verdict = await detection_executor.analyze(request.query)
+        is_malicious = verdict['is_malicious']
+        confidence = verdict['confidence']
+        attack_type = verdict['attack_type']
+        normalized = verdict['normalized_query']
+        fingerprint = verdict['fingerprint']
         
         response_time = (time.time() - start_time) * 1000  # Convert to ms
         
@@ -82,20 +139,22 @@ async def detect_sql_injection(request: QueryRequest):
             attack_type=attack_type,
             source_ip=request.source_ip,
             user_agent=request.user_agent,
-            response_time_ms=response_time
+            response_time_ms=response_time,
+            fingerprint=fingerprint
         )
         
         # Step 6: Broadcast to WebSocket clients if malicious
         if is_malicious:
-            await manager.broadcast({
+            manager.publish_attack({
                 'type': 'attack_detected',
                 'data': {
                     'query': request.query[:100] + '...' if len(request.query) > 100 else request.query,
                     'attack_type': attack_type,
                     'confidence': confidence,
+                    'source_ip': request.source_ip,
                     'timestamp': time.time()
                 }
-            })
+            }, attack_type, confidence, request.source_ip)
         
         return DetectionResponse(
             is_malicious=is_malicious,
@@ -103,9 +162,78 @@ async def detect_sql_injection(request: QueryRequest):
             attack_type=attack_type,
             normalized_query=normalized,
             original_query=request.query,
+            response_time_ms=response_time,
+            fingerprint=fingerprint
+        )
+    
+    except ExecutorSaturated as e:
+        raise _saturated(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/detect/batch", response_model=BatchDetectionResponse)
+async def detect_sql_injection_batch(request: BatchQueryRequest):
+    """
+    Detect SQL injection in a batch of queries with one model call
+    """
+    start_time = time.time()
+    
+    try:
+        # Steps 1-4 for the whole batch on one worker
+        verdicts = await detection_executor.analyze_many(
+            [item.query for item in request.queries]
+        )
+        
+        response_time = (time.time() - start_time) * 1000  # Convert to ms
+        per_query_time = response_time / len(verdicts)
+        
+        results = []
+        records = []
+        for item, verdict in zip(request.queries, verdicts):
+            results.append(DetectionResponse(
+                is_malicious=verdict['is_malicious'],
+                confidence=verdict['confidence'],
+                attack_type=verdict['attack_type'],
+                normalized_query=verdict['normalized_query'],
+                original_query=item.query,
+                response_time_ms=per_query_time,
+                fingerprint=verdict['fingerprint']
+            ))
+            records.append({
+                **verdict,
+                'query': item.query,
+                'source_ip': item.source_ip,
+                'user_agent': item.user_agent,
+                'response_time_ms': per_query_time
+            })
+        
+        # Step 5: Store in knowledge base (single transaction)
+        await knowledge_base.store_detections(records)
+        
+        # Step 6: Broadcast malicious queries to WebSocket clients
+        for item, result in zip(request.queries, results):
+            if result.is_malicious:
+                query = result.original_query
+                manager.publish_attack({
+                    'type': 'attack_detected',
+                    'data': {
+                        'query': query[:100] + '...' if len(query) > 100 else query,
+                        'attack_type': result.attack_type,
+                        'confidence': result.confidence,
+                        'source_ip': item.source_ip,
+                        'timestamp': time.time()
+                    }
+                }, result.attack_type, result.confidence, item.source_ip)
+        
+        return BatchDetectionResponse(
+            results=results,
+            total=len(results),
+            malicious_count=sum(1 for result in results if result.is_malicious),
             response_time_ms=response_time
         )
     
+    except ExecutorSaturated as e:
+        raise _saturated(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -130,15 +258,55 @@ async def vulnerable_endpoint(request: VulnerableQueryRequest):
     }
 
 @router.get("/attacks", response_model=List[AttackRecord])
-async def get_attacks(limit: int = 100):
+async def get_attacks(
+    response: Response,
+    limit: int = Query(100, ge=1),
+    before_id: Optional[int] = None
+):
     """
-    Get recent attack history
+    Get recent attack history, newest first
+    A full page sets X-Next-Before-Id; pass it back as before_id for the next page
     """
+    # Larger limits used to be accepted: clamp them instead of rejecting
+    limit = min(limit, MAX_ATTACKS_PAGE)
     try:
-        attacks = await knowledge_base.get_attack_history(limit)
-        return attacks
+        attacks = await knowledge_base.get_attack_history(limit, before_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if len(attacks) == limit:
+        response.headers['X-Next-Before-Id'] = str(attacks[-1]['id'])
+    return attacks
+
+async def _ndjson(records: AsyncIterator[dict], lines_per_chunk: int = 500) -> AsyncIterator[bytes]:
+    """Encode records as newline-delimited JSON, a few hundred lines per chunk"""
+    lines = []
+    async for record in records:
+        lines.append(json.dumps(record))
+        if len(lines) >= lines_per_chunk:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+@router.get("/attacks/export")
+async def export_attacks(
+    before_id: Optional[int] = None,
+    malicious_only: bool = False,
+    limit: Optional[int] = Query(None, ge=1),
+    include_archived: bool = False
+):
+    """
+    Stream attack history as NDJSON (one record per line, newest first)
+    Rows are read in keyset pages, so exports of any size use constant memory;
+    include_archived continues into retired day partitions
+    """
+    records = knowledge_base.export_attacks(before_id, malicious_only, limit, include_archived)
+    return StreamingResponse(
+        _ndjson(records),
+        media_type='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename="attacks.ndjson"'}
+    )
 
 @router.get("/stats", response_model=Statistics)
 async def get_statistics():
@@ -152,12 +320,12 @@ async def get_statistics():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/timeline")
-async def get_timeline(hours: int = 24):
+async def get_timeline(hours: int = 24, bucket: Literal['minute', 'hour', 'day'] = 'hour'):
     """
     Get attack timeline for visualization
     """
     try:
-        timeline = await knowledge_base.get_timeline(hours)
+        timeline = await knowledge_base.get_timeline(hours, bucket)
         return timeline
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -173,18 +341,144 @@ async def get_patterns():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/fingerprints", response_model=List[FingerprintStats])
+async def get_fingerprints(limit: int = 50):
+    """
+    Get the most frequent query shapes (literals masked)
+    """
+    try:
+        fingerprints = await knowledge_base.get_fingerprints(limit)
+        return fingerprints
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/executor", response_model=ExecutorStatistics)
+async def get_executor_statistics():
+    """
+    Get detection pool queue depth and rejection counters
+    """
+    return detection_executor.get_stats()
+
+@router.get("/writes", response_model=WriteStatistics)
+async def get_write_statistics():
+    """
+    Get knowledge base write-behind counters
+    """
+    return knowledge_base.get_write_stats()
+
+@router.get("/retention", response_model=RetentionStatistics)
+async def get_retention_statistics():
+    """
+    Get retention settings and the catalog of retired partitions
+    """
+    return await retention.get_stats()
+
+@router.post("/retention/run", response_model=RetentionStatistics)
+async def run_retention():
+    """
+    Retire partitions past the retention age now
+    """
+    await retention.run_once()
+    return await retention.get_stats()
+
+@router.get("/broadcast", response_model=BroadcastStatistics)
+async def get_broadcast_statistics():
+    """
+    Get WebSocket fan-out counters (clients, queued, dropped, evicted)
+    """
+    return manager.get_stats()
+
+@router.get("/model", response_model=ModelStatus)
+async def get_model_status():
+    """
+    Get the active model version and the versions available for rollback
+    """
+    return model_registry.get_status()
+
+@router.post("/model/reload", response_model=ModelStatus)
+async def reload_model(request: ModelReloadRequest = None):
+    """
+    Load, warm and atomically activate a model file without a restart
+    """
+    try:
+        status = await model_registry.reload(request.path if request else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    control.publish('model_reload', path=status['active']['path'], version=status['active']['version'])
+    return status
+
+@router.post("/model/rollback", response_model=ModelStatus)
+async def rollback_model():
+    """
+    Reactivate the previous model version
+    """
+    try:
+        status = await model_registry.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    control.publish('model_rollback', version=status['active']['version'])
+    return status
+
+@router.get("/cache", response_model=CacheStatistics)
+async def get_cache_statistics():
+    """
+    Get verdict cache hit/miss counters
+    """
+    return detection_executor.get_cache_stats()
+
+@router.delete("/cache", response_model=CacheStatistics)
+async def clear_cache():
+    """
+    Invalidate all cached verdicts
+    """
+    # Process-pool workers drop theirs on their next task (cache generation)
+    verdict_cache.invalidate()
+    control.publish('cache_clear')
+    return detection_executor.get_cache_stats()
+
+def _handle_ws_message(websocket: WebSocket, data: str):
+    """Apply a subscribe/unsubscribe request; anything else is a heartbeat"""
+    try:
+        message = json.loads(data)
+    except ValueError:
+        message = None
+    if not isinstance(message, dict) or message.get('type') not in ('subscribe', 'unsubscribe'):
+        # Echo back for heartbeat (through the client's writer task)
+        manager.send(websocket, {'type': 'pong'})
+        return
+    
+    payload = {key: value for key, value in message.items() if key != 'type'}
+    if message['type'] == 'unsubscribe':
+        payload = {}
+    try:
+        subscription = WebSocketSubscription(**payload)
+    except ValidationError as e:
+        manager.send(websocket, {'type': 'error', 'detail': e.errors(include_url=False, include_context=False)})
+        return
+    
+    manager.subscribe(websocket, **subscription.model_dump())
+    manager.send(websocket, {'type': 'subscribed', 'data': subscription.model_dump()})
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time updates
+    Send {"type": "subscribe", ...} (see WebSocketSubscription) to filter events
     """
     await manager.connect(websocket)
     try:
+        # Current stats right away; later ticks send only what changed
+        await live_stats.send_snapshot(websocket)
         while True:
-            # Keep connection alive
             data = await websocket.receive_text()
-            # Echo back for heartbeat
-            await websocket.send_json({'type': 'pong'})
-    except WebSocketDisconnect:
+            _handle_ws_message(websocket, data)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the socket was closed by an eviction
+        pass
+    finally:
         manager.disconnect(websocket)
 
@@ -0,0 +1,55 @@
+"""
+Application Settings
+Runtime tunables, overridable through environment variables
+"""
+import os
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def _env_str(name: str, default: str) -> str:
+    value = os.environ.get(name)
+    return value if value not in (None, '') else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+# Verdict cache (0 entries disables it)
+VERDICT_CACHE_SIZE = _env_int('VERDICT_CACHE_SIZE', 10000)
+VERDICT_CACHE_TTL_SECONDS = _env_float('VERDICT_CACHE_TTL_SECONDS', 300.0)
+
+# Detection execution: 'inline' (on the event loop), 'thread' or 'process' pool
+DETECTION_EXECUTOR = _env_str('DETECTION_EXECUTOR', 'thread')
+DETECTION_WORKERS = _env_int('DETECTION_WORKERS', 0)  # 0 = min(4, CPU count)
+DETECTION_QUEUE_SIZE = _env_int('DETECTION_QUEUE_SIZE', 64)  # waiting requests before 429
+
+# Knowledge base writes: 'sync', 'async' (write-behind, drops when full) or 'block'
+KB_WRITE_MODE = _env_str('KB_WRITE_MODE', 'async')
+KB_WRITE_BUFFER_SIZE = _env_int('KB_WRITE_BUFFER_SIZE', 10000)  # buffered records
+KB_WRITE_BATCH_SIZE = _env_int('KB_WRITE_BATCH_SIZE', 500)  # records per transaction
+KB_FLUSH_INTERVAL_SECONDS = _env_float('KB_FLUSH_INTERVAL_SECONDS', 0.05)
+
+# Retention: days of raw attack rows kept in SQLite (0, the default, keeps
+# everything); older days are 'archive'd to columnar files or 'drop'ped
+RETENTION_DAYS = _env_int('RETENTION_DAYS', 0)
+RETENTION_MODE = _env_str('RETENTION_MODE', 'archive')
+ARCHIVE_DIR = _env_str('ARCHIVE_DIR', 'data/archive')
+RETENTION_INTERVAL_SECONDS = _env_float('RETENTION_INTERVAL_SECONDS', 3600.0)
+
+# WebSocket fan-out: per-client queue (oldest dropped when full), send timeout,
+# and consecutive drops after which a slow client is disconnected
+WS_QUEUE_SIZE = _env_int('WS_QUEUE_SIZE', 256)
+WS_SEND_TIMEOUT_SECONDS = _env_float('WS_SEND_TIMEOUT_SECONDS', 5.0)
+WS_MAX_DROPPED = _env_int('WS_MAX_DROPPED', 1024)
+
+# Live dashboard statistics pushed over /api/ws (0 disables)
+LIVE_STATS_INTERVAL_SECONDS = _env_float('LIVE_STATS_INTERVAL_SECONDS', 1.0)
+
+# Reload the model when its file changes, checked every N seconds (0 disables;
+# POST /api/model/reload always works)
+MODEL_WATCH_INTERVAL_SECONDS = _env_float('MODEL_WATCH_INTERVAL_SECONDS', 0.0)
+
+# Print how long each startup phase (imports, model load, database init) took
+STARTUP_TIMING = _env_int('STARTUP_TIMING', 0)
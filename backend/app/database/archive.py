@@ -0,0 +1,239 @@
+"""
+Columnar Archive Format
+Retired knowledge base partitions stored as one directory per day of
+uncompressed .npy columns: numeric columns as typed arrays, text as a UTF-8
+blob plus offsets, and low-cardinality columns as integer codes into a small
+dictionary. Columns are preallocated and filled chunk by chunk, and read
+back memory-mapped a slice at a time, so neither side holds a whole day.
+No pickling is involved in writing or reading.
+"""
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+# 1: single compressed .npz (still readable); 2: directory of .npy columns
+ARCHIVE_FORMAT_VERSION = 2
+
+# Rows decoded at a time when reading an archive
+ARCHIVE_CHUNK_ROWS = 5000
+
+NUMERIC_COLUMNS = {
+    'id': np.int64,
+    'ts_us': np.int64,
+    'is_malicious': np.uint8,
+    'confidence': np.float64,
+    'response_time_ms': np.float64,  # NaN for NULL
+}
+STRING_COLUMNS = ('query', 'normalized_query', 'fingerprint')
+DICTIONARY_COLUMNS = ('attack_type', 'source_ip', 'user_agent')
+
+def _encode_strings(values: List) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """UTF-8 blob, n+1 offsets and a null mask for a list of optional strings"""
+    encoded = [value.encode('utf-8') if value is not None else b'' for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    nulls = np.array([value is None for value in values], dtype=bool)
+    return data, offsets, nulls
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray, nulls: np.ndarray) -> List:
+    """Decode rows whose offsets are relative to the start of data"""
+    blob = data.tobytes()
+    bounds = offsets.tolist()
+    return [
+        None if null else blob[bounds[index]:bounds[index + 1]].decode('utf-8')
+        for index, null in enumerate(nulls.tolist())
+    ]
+
+class ArchiveWriter:
+    """
+    Writes one archive directory chunk by chunk
+    row_count and the UTF-8 byte total of each string column must be known
+    up front (see Database.get_partition_summary): every column is a
+    preallocated .npy file filled in place
+    """
+    def __init__(self, path: str, row_count: int, string_bytes: Dict[str, int]):
+        self.path = Path(path)
+        self.row_count = row_count
+        self._tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        if self._tmp_path.exists():
+            shutil.rmtree(self._tmp_path)
+        self._tmp_path.mkdir(parents=True)
+
+        self._columns: Dict[str, np.ndarray] = {}
+        for column, dtype in NUMERIC_COLUMNS.items():
+            self._allocate(column, dtype, row_count)
+        for column in STRING_COLUMNS:
+            self._allocate(f'{column}.data', np.uint8, string_bytes[column])
+            self._allocate(f'{column}.offsets', np.int64, row_count + 1)
+            self._allocate(f'{column}.nulls', bool, row_count)
+        for column in DICTIONARY_COLUMNS:
+            self._allocate(f'{column}.codes', np.int32, row_count)
+
+        self._dictionaries: Dict[str, Dict[str, int]] = {column: {} for column in DICTIONARY_COLUMNS}
+        self._string_end = {column: 0 for column in STRING_COLUMNS}
+        self._rows = 0
+
+    def _allocate(self, name: str, dtype, length: int):
+        self._columns[name] = np.lib.format.open_memmap(
+            self._tmp_path / f'{name}.npy', mode='w+', dtype=dtype, shape=(length,)
+        )
+
+    def append(self, records: List[Dict]):
+        """Write the next chunk of rows (ts_us-keyed dicts, oldest first)"""
+        start, end = self._rows, self._rows + len(records)
+        if end > self.row_count:
+            raise ValueError(f"Archive {self.path} expected {self.row_count} rows, got more")
+        columns = self._columns
+
+        for column, dtype in NUMERIC_COLUMNS.items():
+            values = [record[column] for record in records]
+            if column == 'response_time_ms':
+                values = [np.nan if value is None else value for value in values]
+            columns[column][start:end] = np.array(values, dtype=dtype)
+
+        for column in STRING_COLUMNS:
+            data, offsets, nulls = _encode_strings([record[column] for record in records])
+            base = self._string_end[column]
+            if base + len(data) > len(columns[f'{column}.data']):
+                raise ValueError(f"Archive {self.path}: {column} is longer than announced")
+            columns[f'{column}.data'][base:base + len(data)] = data
+            columns[f'{column}.offsets'][start + 1:end + 1] = offsets[1:] + base
+            columns[f'{column}.nulls'][start:end] = nulls
+            self._string_end[column] = base + len(data)
+
+        for column in DICTIONARY_COLUMNS:
+            dictionary = self._dictionaries[column]
+            columns[f'{column}.codes'][start:end] = np.array([
+                -1 if record[column] is None else dictionary.setdefault(record[column], len(dictionary))
+                for record in records
+            ], dtype=np.int32)
+
+        self._rows = end
+
+    def close(self) -> int:
+        """Finish the archive and move it into place; returns its size in bytes"""
+        if self._rows != self.row_count:
+            raise ValueError(f"Archive {self.path} expected {self.row_count} rows, got {self._rows}")
+
+        for array in self._columns.values():
+            array.flush()
+        self._columns.clear()
+
+        for column, dictionary in self._dictionaries.items():
+            data, offsets, _ = _encode_strings(list(dictionary))
+            np.save(self._tmp_path / f'{column}.dict_data.npy', data)
+            np.save(self._tmp_path / f'{column}.dict_offsets.npy', offsets)
+        with open(self._tmp_path / 'manifest.json', 'w') as f:
+            json.dump({'format_version': ARCHIVE_FORMAT_VERSION, 'row_count': self.row_count}, f)
+
+        # Written under a temporary name so a crash never leaves a partial archive
+        self._tmp_path.rename(self.path)
+        return sum(file.stat().st_size for file in self.path.iterdir())
+
+    def abort(self):
+        """Drop a partly written archive"""
+        self._columns.clear()
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+def write_archive(path: str, records: List[Dict]) -> int:
+    """Write records (ts_us-keyed rows) to an archive in one go; returns its size"""
+    writer = ArchiveWriter(path, len(records), {
+        column: sum(len(record[column].encode('utf-8')) for record in records if record[column] is not None)
+        for column in STRING_COLUMNS
+    })
+    try:
+        writer.append(records)
+        return writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+def read_archive(path: str, newest_first: bool = False) -> Iterator[Dict]:
+    """Yield the rows of an archive as ts_us-keyed dicts, decoding a slice at a time"""
+    if Path(path).suffix == '.npz':
+        yield from _read_npz_archive(path, newest_first)
+        return
+
+    directory = Path(path)
+    with open(directory / 'manifest.json') as f:
+        manifest = json.load(f)
+    version = manifest['format_version']
+    if version != ARCHIVE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported archive format version {version} in {path}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(directory / f'{name}.npy', mmap_mode='r')
+
+    columns = {column: load(column) for column in NUMERIC_COLUMNS}
+    for column in STRING_COLUMNS:
+        for part in ('data', 'offsets', 'nulls'):
+            columns[f'{column}.{part}'] = load(f'{column}.{part}')
+    dictionaries = {}
+    for column in DICTIONARY_COLUMNS:
+        columns[f'{column}.codes'] = load(f'{column}.codes')
+        dict_offsets = load(f'{column}.dict_offsets')
+        dictionaries[column] = _decode_strings(
+            load(f'{column}.dict_data'), dict_offsets, np.zeros(len(dict_offsets) - 1, dtype=bool)
+        )
+
+    rows = manifest['row_count']
+    starts = range(0, rows, ARCHIVE_CHUNK_ROWS)
+    for start in (reversed(starts) if newest_first else starts):
+        chunk = _read_slice(columns, dictionaries, start, min(start + ARCHIVE_CHUNK_ROWS, rows))
+        yield from (reversed(chunk) if newest_first else chunk)
+
+def _read_slice(columns: Dict[str, np.ndarray], dictionaries: Dict[str, List], start: int, end: int) -> List[Dict]:
+    values = {column: columns[column][start:end].tolist() for column in NUMERIC_COLUMNS}
+    for column in STRING_COLUMNS:
+        offsets = np.array(columns[f'{column}.offsets'][start:end + 1])
+        values[column] = _decode_strings(
+            columns[f'{column}.data'][offsets[0]:offsets[-1]],
+            offsets - offsets[0],
+            columns[f'{column}.nulls'][start:end]
+        )
+    for column in DICTIONARY_COLUMNS:
+        dictionary = dictionaries[column]
+        values[column] = [
+            None if code < 0 else dictionary[code]
+            for code in columns[f'{column}.codes'][start:end].tolist()
+        ]
+    return _rows(values, end - start)
+
+def _rows(values: Dict[str, List], count: int) -> List[Dict]:
+    records = []
+    for index in range(count):
+        record = {column: column_values[index] for column, column_values in values.items()}
+        if record['response_time_ms'] != record['response_time_ms']:  # NaN
+            record['response_time_ms'] = None
+        records.append(record)
+    return records
+
+def _read_npz_archive(path: str, newest_first: bool) -> Iterator[Dict]:
+    """Format 1 archives: compressed, so they are decoded whole"""
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data['format_version'])
+        if version != 1:
+            raise ValueError(f"Unsupported archive format version {version} in {path}")
+
+        columns = {column: data[column].tolist() for column in NUMERIC_COLUMNS}
+        for column in STRING_COLUMNS:
+            columns[column] = _decode_strings(
+                data[f'{column}.data'], data[f'{column}.offsets'], data[f'{column}.nulls']
+            )
+        for column in DICTIONARY_COLUMNS:
+            dict_offsets = data[f'{column}.dict_offsets']
+            dictionary = _decode_strings(
+                data[f'{column}.dict_data'], dict_offsets,
+                np.zeros(len(dict_offsets) - 1, dtype=bool)
+            )
+            columns[column] = [
+                None if code < 0 else dictionary[code]
+                for code in data[f'{column}.codes'].tolist()
+            ]
+
+    records = _rows(columns, len(columns['id']))
+    yield from (reversed(records) if newest_first else records)
@@ -0,0 +1,103 @@
+"""
+Schema Migrations
+Converts knowledge base files written by older releases to the current layout
+"""
+import aiosqlite
+
+# Stored in PRAGMA user_version
+# 1: ISO text timestamps, attack_type/source_ip/user_agent inline as TEXT
+# 2: epoch-microsecond ts_us, dictionary-encoded lookup columns
+# 3: retention partitions; aggregate delete triggers skip retention deletes
+SCHEMA_VERSION = 3
+
+# Tables and triggers derived from attacks; rebuilt from scratch after a migration
+V1_DERIVED_TABLES = [
+    'fingerprints',
+    'attack_summary',
+    'attack_type_counts',
+    'attack_rollup_minute',
+    'attack_rollup_hour',
+    'attack_rollup_day',
+]
+
+# v1 stored datetime.now().isoformat() (local time, optional .ffffff);
+# 'utc' converts local to UTC and the fraction is right-padded to 6 digits
+V1_TS_US_SQL = """
+    CAST(strftime('%s', v1.timestamp, 'utc') AS INTEGER) * 1000000
+    + CAST(substr(substr(v1.timestamp, 21) || '000000', 1, 6) AS INTEGER)
+"""
+
+# Triggers whose definition changed in v3, recreated by Database.initialize
+V2_REPLACED_TRIGGERS = [
+    'trg_attacks_summary_delete',
+    'trg_attacks_type_delete',
+    'trg_attacks_rollup_minute_delete',
+    'trg_attacks_rollup_hour_delete',
+    'trg_attacks_rollup_day_delete',
+]
+
+async def _columns(db: aiosqlite.Connection, table: str) -> set:
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        return {row[1] async for row in cursor}
+
+async def needs_migration(db: aiosqlite.Connection) -> bool:
+    """True if attacks still has the v1 layout"""
+    return 'timestamp' in await _columns(db, 'attacks')
+
+async def detach_v1(db: aiosqlite.Connection):
+    """Drop v1 derived objects and set the old attacks table aside as attacks_v1"""
+    async with db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'attacks'"
+    ) as cursor:
+        triggers = [row[0] async for row in cursor]
+    for trigger in triggers:
+        await db.execute(f"DROP TRIGGER {trigger}")
+
+    for table in V1_DERIVED_TABLES:
+        await db.execute(f"DROP TABLE IF EXISTS {table}")
+
+    # Index names are global, so the v1 ones must go before v2 creates its own
+    for index in ('idx_timestamp', 'idx_is_malicious', 'idx_attack_type', 'idx_fingerprint'):
+        await db.execute(f"DROP INDEX IF EXISTS {index}")
+
+    await db.execute("ALTER TABLE attacks RENAME TO attacks_v1")
+
+async def copy_v1(db: aiosqlite.Connection) -> int:
+    """Copy attacks_v1 into the v2 tables (which must already exist) and drop it"""
+    for column, table, value_column in (
+        ('attack_type', 'attack_types', 'name'),
+        ('source_ip', 'source_ips', 'value'),
+        ('user_agent', 'user_agents', 'value'),
+    ):
+        await db.execute(f"""
+            INSERT OR IGNORE INTO {table} ({value_column})
+            SELECT DISTINCT {column} FROM attacks_v1 WHERE {column} IS NOT NULL
+        """)
+
+    # Very old files predate the fingerprint column
+    fingerprint = 'v1.fingerprint' if 'fingerprint' in await _columns(db, 'attacks_v1') else 'NULL'
+
+    cursor = await db.execute(f"""
+        INSERT INTO attacks (
+            id, ts_us, query, normalized_query, is_malicious, confidence,
+            attack_type_id, source_ip_id, user_agent_id, response_time_ms, fingerprint
+        )
+        SELECT
+            v1.id, {V1_TS_US_SQL}, v1.query, v1.normalized_query,
+            CASE WHEN v1.is_malicious THEN 1 ELSE 0 END, v1.confidence,
+            t.id, s.id, u.id, v1.response_time_ms, {fingerprint}
+        FROM attacks_v1 v1
+        LEFT JOIN attack_types t ON t.name = v1.attack_type
+        LEFT JOIN source_ips s ON s.value = v1.source_ip
+        LEFT JOIN user_agents u ON u.value = v1.user_agent
+        ORDER BY v1.id
+    """)
+    copied = cursor.rowcount
+
+    await db.execute("DROP TABLE attacks_v1")
+    return copied
+
+async def replace_v2_triggers(db: aiosqlite.Connection):
+    """Drop v2 delete triggers so their v3 definitions can be created"""
+    for trigger in V2_REPLACED_TRIGGERS:
+        await db.execute(f"DROP TRIGGER IF EXISTS {trigger}")
@@ -2,50 +2,508 @@
 Database Schema for Knowledge Base
 SQLite database for storing attack data
 """
+import asyncio
 import sqlite3
+import time
 import aiosqlite
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Dict, Optional
+
+from .archive import read_archive
+from .migrations import SCHEMA_VERSION, needs_migration, detach_v1, copy_v1, replace_v2_triggers
+
+# Applied to every pooled connection
+CONNECTION_PRAGMAS = [
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",  # WAL makes NORMAL crash-safe; fsync only at checkpoint
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",  # 16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped reads
+]
+
+# Timeline rollup granularities and their width in seconds
+TIMELINE_BUCKETS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+# Low-cardinality columns stored once in lookup tables:
+# record key -> (lookup table, value column, attacks foreign key)
+LOOKUP_COLUMNS = {
+    'attack_type': ('attack_types', 'name', 'attack_type_id'),
+    'source_ip': ('source_ips', 'value', 'source_ip_id'),
+    'user_agent': ('user_agents', 'value', 'user_agent_id'),
+}
+
+INSERT_ATTACK_SQL = """
+    INSERT INTO attacks (
+        ts_us, query, normalized_query, is_malicious, confidence,
+        attack_type_id, source_ip_id, user_agent_id, response_time_ms, fingerprint
+    ) VALUES (
+        ?, ?, ?, ?, ?,
+        (SELECT id FROM attack_types WHERE name = ?),
+        (SELECT id FROM source_ips WHERE value = ?),
+        (SELECT id FROM user_agents WHERE value = ?),
+        ?, ?
+    )
+"""
+
+# Attack rows with lookup columns resolved back to their text values
+SELECT_ATTACKS_SQL = """
+    SELECT
+        a.id, a.ts_us, a.query, a.normalized_query, a.is_malicious, a.confidence,
+        t.name AS attack_type, s.value AS source_ip, u.value AS user_agent,
+        a.response_time_ms, a.fingerprint
+    FROM attacks a
+    LEFT JOIN attack_types t ON t.id = a.attack_type_id
+    LEFT JOIN source_ips s ON s.id = a.source_ip_id
+    LEFT JOIN user_agents u ON u.id = a.user_agent_id
+"""
+
+# Upper bound for keyset pagination when no before_id is given
+MAX_ROW_ID = 2**63 - 1
+
+def now_us() -> int:
+    """Current time as integer epoch microseconds (UTC)"""
+    return time.time_ns() // 1000
+
+def us_to_iso(ts_us: int) -> str:
+    """Epoch microseconds to an ISO-8601 UTC timestamp"""
+    seconds, micros = divmod(ts_us, 1_000_000)
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(microsecond=micros).isoformat()
 
 class Database:
-    def __init__(self, db_path: str = "data/knowledge_base.db"):
+    def __init__(self, db_path: str = "data/knowledge_base.db", read_pool_size: int = 4):
         self.db_path = db_path
+        self.read_pool_size = read_pool_size
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        # Opened by initialize(), closed by close()
+        self._writer_conn: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_conns: List[aiosqlite.Connection] = []
+    
+    async def _connect(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Open one long-lived connection with tuned pragmas"""
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        pragmas = CONNECTION_PRAGMAS + (["PRAGMA query_only = ON"] if read_only else [])
+        for pragma in pragmas:
+            # Drain result rows so no statement keeps the file locked
+            async with conn.execute(pragma) as cursor:
+                await cursor.fetchall()
+        return conn
+    
+    async def open(self):
+        """Open the writer connection and the reader pool"""
+        if self._writer_conn is not None:
+            return
+        
+        self._writer_conn = await self._connect()
+        # WAL lets readers run concurrently with the insert stream
+        async with self._writer_conn.execute("PRAGMA journal_mode = WAL") as cursor:
+            await cursor.fetchall()
+        
+        self._readers = asyncio.Queue()
+        for _ in range(self.read_pool_size):
+            conn = await self._connect(read_only=True)
+            self._reader_conns.append(conn)
+            self._readers.put_nowait(conn)
+    
+    async def close(self):
+        """Close all pooled connections"""
+        if self._writer_conn is None:
+            return
+        
+        async with self._write_lock:
+            await self._writer_conn.close()
+            self._writer_conn = None
+        
+        for conn in self._reader_conns:
+            await conn.close()
+        self._reader_conns = []
+        self._readers = None
+        
+        print("Database connections closed")
+    
+    @asynccontextmanager
+    async def _writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Exclusive access to the single writer connection"""
+        if self._writer_conn is None:
+            raise RuntimeError("Database not initialized; call initialize() first")
+        async with self._write_lock:
+            try:
+                yield self._writer_conn
+            except BaseException:
+                # Otherwise the next write on this connection commits the half-done work
+                await self._writer_conn.rollback()
+                raise
+    
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection from the pool"""
+        if self._readers is None:
+            raise RuntimeError("Database not initialized; call initialize() first")
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
     
     async def initialize(self):
-        """Create database tables"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Open the connection pool, migrate old schemas and create tables"""
+        await self.open()
+        
+        async with self._writer() as db:
+            # Schema changes (and any migration) happen in one transaction
+            await db.execute("BEGIN IMMEDIATE")
+            
+            async with db.execute("PRAGMA user_version") as cursor:
+                version = (await cursor.fetchone())[0]
+            
+            legacy = await self._table_exists(db, 'attacks') and await needs_migration(db)
+            if legacy:
+                await detach_v1(db)
+            elif 0 < version < SCHEMA_VERSION:
+                await replace_v2_triggers(db)
+            
+            await self._create_tables(db)
+            await self._create_retention_tables(db)
+            
+            if legacy:
+                copied = await copy_v1(db)
+                print(f"✓ Migrated {copied} attack records to schema v{SCHEMA_VERSION}")
+            
+            # Derived tables backfill themselves when (re)created
+            await self._create_fingerprint_table(db)
+            await self._create_statistics_tables(db)
+            await self._create_rollup_tables(db)
+            
+            await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            await db.commit()
+        
+        print(f"Database initialized at {self.db_path}")
+    
+    @staticmethod
+    async def _table_exists(db: aiosqlite.Connection, name: str) -> bool:
+        async with db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ) as cursor:
+            return await cursor.fetchone() is not None
+    
+    async def _create_tables(self, db: aiosqlite.Connection):
+        """Attacks table with integer timestamps and dictionary-encoded columns"""
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS attack_types (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        """)
+        
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS source_ips (
+                id INTEGER PRIMARY KEY,
+                value TEXT NOT NULL UNIQUE
+            )
+        """)
+        
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS user_agents (
+                id INTEGER PRIMARY KEY,
+                value TEXT NOT NULL UNIQUE
+            )
+        """)
+        
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS attacks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts_us INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                normalized_query TEXT,
+                is_malicious INTEGER NOT NULL,
+                confidence REAL NOT NULL,
+                attack_type_id INTEGER REFERENCES attack_types(id),
+                source_ip_id INTEGER REFERENCES source_ips(id),
+                user_agent_id INTEGER REFERENCES user_agents(id),
+                response_time_ms REAL,
+                fingerprint TEXT
+            )
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attacks_ts ON attacks(ts_us)
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attacks_attack_type ON attacks(attack_type_id)
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attacks_source_ip ON attacks(source_ip_id)
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attacks_fingerprint ON attacks(fingerprint)
+        """)
+    
+    async def _create_retention_tables(self, db: aiosqlite.Connection):
+        """Catalog of retired day partitions and the retention delete guard"""
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS attack_partitions (
+                id INTEGER PRIMARY KEY,
+                day TEXT NOT NULL,
+                start_us INTEGER NOT NULL,
+                end_us INTEGER NOT NULL,
+                first_id INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                malicious_count INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                archive_path TEXT,
+                archive_bytes INTEGER,
+                retired_at_us INTEGER NOT NULL
+            )
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attack_partitions_last_id ON attack_partitions(last_id)
+        """)
+        
+        # Holds a row only inside a retention transaction; aggregate delete
+        # triggers check it so statistics and timelines keep retired rows
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS retention_guard (
+                id INTEGER PRIMARY KEY CHECK (id = 1)
+            )
+        """)
+    
+    async def _create_fingerprint_table(self, db: aiosqlite.Connection):
+        """Per-fingerprint aggregates, maintained on insert"""
+        exists = await self._table_exists(db, 'fingerprints')
+        
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                fingerprint TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                malicious_count INTEGER NOT NULL,
+                first_seen_us INTEGER NOT NULL,
+                last_seen_us INTEGER NOT NULL
+            )
+        """)
+        
+        # Backfill once from existing rows (e.g. right after a migration)
+        if not exists:
             await db.execute("""
-                CREATE TABLE IF NOT EXISTS attacks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    query TEXT NOT NULL,
-                    normalized_query TEXT,
-                    is_malicious INTEGER NOT NULL,
-                    confidence REAL NOT NULL,
-                    attack_type TEXT,
-                    source_ip TEXT,
-                    user_agent TEXT,
-                    response_time_ms REAL
+                INSERT INTO fingerprints (
+                    fingerprint, count, malicious_count, first_seen_us, last_seen_us
                 )
+                SELECT fingerprint, COUNT(*), SUM(is_malicious), MIN(ts_us), MAX(ts_us)
+                FROM attacks
+                WHERE fingerprint IS NOT NULL
+                GROUP BY fingerprint
             """)
-            
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_attacks_fingerprint
+            AFTER INSERT ON attacks
+            WHEN NEW.fingerprint IS NOT NULL
+            BEGIN
+                INSERT INTO fingerprints (
+                    fingerprint, count, malicious_count, first_seen_us, last_seen_us
+                ) VALUES (
+                    NEW.fingerprint, 1, NEW.is_malicious, NEW.ts_us, NEW.ts_us
+                )
+                ON CONFLICT(fingerprint) DO UPDATE SET
+                    count = count + 1,
+                    malicious_count = malicious_count + NEW.is_malicious,
+                    last_seen_us = MAX(last_seen_us, NEW.ts_us);
+            END
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_fingerprints_count ON fingerprints(count)
+        """)
+    
+    async def _create_statistics_tables(self, db: aiosqlite.Connection):
+        """
+        Running totals kept in step with attacks by triggers, so statistics
+        are read in O(1) instead of aggregating the whole table
+        """
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS attack_summary (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_queries INTEGER NOT NULL,
+                malicious_queries INTEGER NOT NULL,
+                malicious_confidence_sum REAL NOT NULL
+            )
+        """)
+        
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS attack_type_counts (
+                attack_type_id INTEGER PRIMARY KEY REFERENCES attack_types(id),
+                count INTEGER NOT NULL
+            )
+        """)
+        
+        # Backfill once from existing rows (databases created before the summary)
+        async with db.execute("SELECT 1 FROM attack_summary WHERE id = 1") as cursor:
+            has_summary = await cursor.fetchone() is not None
+        if not has_summary:
             await db.execute("""
-                CREATE INDEX IF NOT EXISTS idx_timestamp ON attacks(timestamp)
+                INSERT INTO attack_summary (
+                    id, total_queries, malicious_queries, malicious_confidence_sum
+                )
+                SELECT
+                    1,
+                    COUNT(*),
+                    COALESCE(SUM(is_malicious), 0),
+                    COALESCE(SUM(CASE WHEN is_malicious = 1 THEN confidence ELSE 0 END), 0.0)
+                FROM attacks
             """)
-            
+            await db.execute("DELETE FROM attack_type_counts")
             await db.execute("""
-                CREATE INDEX IF NOT EXISTS idx_is_malicious ON attacks(is_malicious)
+                INSERT INTO attack_type_counts (attack_type_id, count)
+                SELECT attack_type_id, COUNT(*)
+                FROM attacks
+                WHERE is_malicious = 1 AND attack_type_id IS NOT NULL
+                GROUP BY attack_type_id
+            """)
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_attacks_summary_insert
+            AFTER INSERT ON attacks
+            BEGIN
+                UPDATE attack_summary SET
+                    total_queries = total_queries + 1,
+                    malicious_queries = malicious_queries + NEW.is_malicious,
+                    malicious_confidence_sum = malicious_confidence_sum
+                        + CASE WHEN NEW.is_malicious = 1 THEN NEW.confidence ELSE 0 END
+                WHERE id = 1;
+            END
+        """)
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_attacks_summary_delete
+            AFTER DELETE ON attacks
+            WHEN NOT EXISTS (SELECT 1 FROM retention_guard)
+            BEGIN
+                UPDATE attack_summary SET
+                    total_queries = total_queries - 1,
+                    malicious_queries = malicious_queries - OLD.is_malicious,
+                    malicious_confidence_sum = malicious_confidence_sum
+                        - CASE WHEN OLD.is_malicious = 1 THEN OLD.confidence ELSE 0 END
+                WHERE id = 1;
+            END
+        """)
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_attacks_type_insert
+            AFTER INSERT ON attacks
+            WHEN NEW.is_malicious = 1 AND NEW.attack_type_id IS NOT NULL
+            BEGIN
+                INSERT INTO attack_type_counts (attack_type_id, count)
+                VALUES (NEW.attack_type_id, 1)
+                ON CONFLICT(attack_type_id) DO UPDATE SET count = count + 1;
+            END
+        """)
+        
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_attacks_type_delete
+            AFTER DELETE ON attacks
+            WHEN OLD.is_malicious = 1 AND OLD.attack_type_id IS NOT NULL
+                AND NOT EXISTS (SELECT 1 FROM retention_guard)
+            BEGIN
+                UPDATE attack_type_counts SET count = count - 1
+                WHERE attack_type_id = OLD.attack_type_id;
+                DELETE FROM attack_type_counts
+                WHERE attack_type_id = OLD.attack_type_id AND count <= 0;
+            END
+        """)
+    
+    async def _create_rollup_tables(self, db: aiosqlite.Connection):
+        """
+        Per-minute/hour/day counts filled by triggers on insert, so timelines
+        are answered from one row per bucket instead of scanning attacks
+        """
+        for granularity, seconds in TIMELINE_BUCKETS.items():
+            table = f"attack_rollup_{granularity}"
+            # Bucket start as epoch seconds
+            bucket = f"(({{row}}.ts_us / {seconds * 1_000_000}) * {seconds})"
+            
+            exists = await self._table_exists(db, table)
+            
+            await db.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket INTEGER PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    malicious_count INTEGER NOT NULL
+                )
             """)
             
-            await db.execute("""
-                CREATE INDEX IF NOT EXISTS idx_attack_type ON attacks(attack_type)
+            # Backfill once from existing rows (databases created before rollups)
+            if not exists:
+                await db.execute(f"""
+                    INSERT INTO {table} (bucket, count, malicious_count)
+                    SELECT {bucket.format(row='attacks')} AS b, COUNT(*), SUM(is_malicious)
+                    FROM attacks
+                    GROUP BY b
+                """)
+            
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_attacks_rollup_{granularity}_insert
+                AFTER INSERT ON attacks
+                BEGIN
+                    INSERT INTO {table} (bucket, count, malicious_count)
+                    VALUES ({bucket.format(row='NEW')}, 1, NEW.is_malicious)
+                    ON CONFLICT(bucket) DO UPDATE SET
+                        count = count + 1,
+                        malicious_count = malicious_count + NEW.is_malicious;
+                END
             """)
             
-            await db.commit()
-        
-        print(f"Database initialized at {self.db_path}")
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_attacks_rollup_{granularity}_delete
+                AFTER DELETE ON attacks
+                WHEN NOT EXISTS (SELECT 1 FROM retention_guard)
+                BEGIN
+                    UPDATE {table} SET
+                        count = count - 1,
+                        malicious_count = malicious_count - OLD.is_malicious
+                    WHERE bucket = {bucket.format(row='OLD')};
+                    DELETE FROM {table}
+                    WHERE bucket = {bucket.format(row='OLD')} AND count <= 0;
+                END
+            """)
+    
+    @staticmethod
+    def _attack_row(record: Dict, ts_us: int) -> tuple:
+        """Parameters for INSERT_ATTACK_SQL"""
+        return (
+            record.get('ts_us') or ts_us,
+            record['query'],
+            record['normalized_query'],
+            1 if record['is_malicious'] else 0,
+            record['confidence'],
+            record.get('attack_type'),
+            record.get('source_ip'),
+            record.get('user_agent'),
+            record.get('response_time_ms'),
+            record.get('fingerprint')
+        )
+    
+    async def _register_lookups(self, db: aiosqlite.Connection, records: List[Dict]):
+        """Make sure every lookup value in records has an id"""
+        for key, (table, column, _) in LOOKUP_COLUMNS.items():
+            values = {record.get(key) for record in records} - {None}
+            if values:
+                await db.executemany(
+                    f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)",
+                    [(value,) for value in values]
+                )
     
     async def insert_attack(
         self,
@@ -56,72 +514,266 @@ class Database:
         attack_type: Optional[str] = None,
         source_ip: Optional[str] = None,
         user_agent: Optional[str] = None,
-        response_time_ms: Optional[float] = None
+        response_time_ms: Optional[float] = None,
+        fingerprint: Optional[str] = None,
+        ts_us: Optional[int] = None
     ) -> int:
-        """Insert attack record"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                INSERT INTO attacks (
-                    timestamp, query, normalized_query, is_malicious,
-                    confidence, attack_type, source_ip, user_agent, response_time_ms
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                datetime.now().isoformat(),
-                query,
-                normalized_query,
-                1 if is_malicious else 0,
-                confidence,
-                attack_type,
-                source_ip,
-                user_agent,
-                response_time_ms
-            ))
+        """Insert attack record (ts_us defaults to now)"""
+        record = {
+            'ts_us': ts_us,
+            'query': query,
+            'normalized_query': normalized_query,
+            'is_malicious': is_malicious,
+            'confidence': confidence,
+            'attack_type': attack_type,
+            'source_ip': source_ip,
+            'user_agent': user_agent,
+            'response_time_ms': response_time_ms,
+            'fingerprint': fingerprint,
+        }
+        
+        async with self._writer() as db:
+            await self._register_lookups(db, [record])
+            cursor = await db.execute(INSERT_ATTACK_SQL, self._attack_row(record, now_us()))
             
             await db.commit()
             return cursor.lastrowid
     
-    async def get_recent_attacks(self, limit: int = 100) -> List[Dict]:
-        """Get recent attack records"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("""
-                SELECT * FROM attacks
-                ORDER BY timestamp DESC
+    async def insert_attacks(self, records: List[Dict]) -> int:
+        """Insert many attack records in a single transaction"""
+        ts_us = now_us()
+        rows = [self._attack_row(record, ts_us) for record in records]
+        
+        async with self._writer() as db:
+            await self._register_lookups(db, records)
+            await db.executemany(INSERT_ATTACK_SQL, rows)
+            
+            await db.commit()
+            return len(rows)
+    
+    @staticmethod
+    def _attack_record(row: aiosqlite.Row) -> Dict:
+        """API shape of an attack row: ISO timestamp instead of ts_us"""
+        record = dict(row)
+        record['timestamp'] = us_to_iso(record.pop('ts_us'))
+        return record
+    
+    async def get_recent_attacks(self, limit: int = 100, before_id: Optional[int] = None) -> List[Dict]:
+        """
+        Get recent attack records, newest first
+        Pass the last id of a page as before_id to fetch the next one
+        """
+        async with self._reader() as db:
+            async with db.execute(f"""
+                {SELECT_ATTACKS_SQL}
+                WHERE a.id < ?
+                ORDER BY a.id DESC
                 LIMIT ?
-            """, (limit,)) as cursor:
+            """, (before_id if before_id is not None else MAX_ROW_ID, limit)) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+                return [self._attack_record(row) for row in rows]
     
-    async def get_statistics(self) -> Dict:
-        """Get attack statistics"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Total queries
-            async with db.execute("SELECT COUNT(*) FROM attacks") as cursor:
-                total_queries = (await cursor.fetchone())[0]
-            
-            # Malicious queries
-            async with db.execute(
-                "SELECT COUNT(*) FROM attacks WHERE is_malicious = 1"
-            ) as cursor:
-                malicious_queries = (await cursor.fetchone())[0]
-            
-            # Average confidence
-            async with db.execute(
-                "SELECT AVG(confidence) FROM attacks WHERE is_malicious = 1"
-            ) as cursor:
-                avg_confidence = (await cursor.fetchone())[0] or 0.0
-            
-            # Attack type distribution
+    async def iter_attacks(
+        self,
+        before_id: Optional[int] = None,
+        malicious_only: bool = False,
+        limit: Optional[int] = None,
+        include_archived: bool = False,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield attack records newest first, one keyset page at a time
+        A reader is held only while a page is read, so long exports
+        neither pin a pool connection nor keep a WAL snapshot open.
+        With include_archived, continues into archived day partitions
+        older than the cursor (only those files are opened).
+        """
+        cursor_id = before_id if before_id is not None else MAX_ROW_ID
+        remaining = limit
+        malicious_filter = "AND a.is_malicious = 1" if malicious_only else ""
+        
+        while remaining is None or remaining > 0:
+            page_size = batch_size if remaining is None else min(batch_size, remaining)
+            async with self._reader() as db:
+                async with db.execute(f"""
+                    {SELECT_ATTACKS_SQL}
+                    WHERE a.id < ? {malicious_filter}
+                    ORDER BY a.id DESC
+                    LIMIT ?
+                """, (cursor_id, page_size)) as cursor:
+                    rows = await cursor.fetchall()
+            
+            for row in rows:
+                yield self._attack_record(row)
+            
+            if rows:
+                cursor_id = rows[-1]['id']
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < page_size:
+                break
+        
+        if not include_archived or remaining == 0:
+            return
+        
+        for partition in await self.get_partitions(before_id=cursor_id, state='archived'):
+            for record in read_archive(partition['archive_path'], newest_first=True):
+                if record['id'] >= cursor_id or (malicious_only and not record['is_malicious']):
+                    continue
+                record['timestamp'] = us_to_iso(record.pop('ts_us'))
+                yield record
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining == 0:
+                        return
+    
+    async def get_oldest_timestamp(self) -> Optional[int]:
+        """ts_us of the oldest row still in the attacks table"""
+        async with self._reader() as db:
+            async with db.execute("SELECT MIN(ts_us) FROM attacks") as cursor:
+                return (await cursor.fetchone())[0]
+    
+    async def get_partition_summary(self, start_us: int, end_us: int) -> Dict:
+        """Row count, first id and UTF-8 byte total of each text column in [start_us, end_us)"""
+        async with self._reader() as db:
+            async with db.execute("""
+                SELECT
+                    COUNT(*), MIN(id),
+                    COALESCE(SUM(LENGTH(CAST(query AS BLOB))), 0),
+                    COALESCE(SUM(LENGTH(CAST(normalized_query AS BLOB))), 0),
+                    COALESCE(SUM(LENGTH(CAST(fingerprint AS BLOB))), 0)
+                FROM attacks
+                WHERE ts_us >= ? AND ts_us < ?
+            """, (start_us, end_us)) as cursor:
+                row_count, first_id, query_bytes, normalized_bytes, fingerprint_bytes = await cursor.fetchone()
+        
+        return {
+            'row_count': row_count,
+            'first_id': first_id,
+            'string_bytes': {
+                'query': query_bytes,
+                'normalized_query': normalized_bytes,
+                'fingerprint': fingerprint_bytes,
+            },
+        }
+    
+    async def iter_partition(self, start_us: int, end_us: int, batch_size: int = 5000) -> AsyncIterator[Dict]:
+        """Yield raw rows (ts_us, lookup values resolved) in [start_us, end_us), oldest first"""
+        last = (start_us - 1, MAX_ROW_ID)
+        while True:
+            async with self._reader() as db:
+                async with db.execute(f"""
+                    {SELECT_ATTACKS_SQL}
+                    WHERE a.ts_us >= ? AND a.ts_us < ? AND (a.ts_us, a.id) > (?, ?)
+                    ORDER BY a.ts_us, a.id
+                    LIMIT ?
+                """, (start_us, end_us, *last, batch_size)) as cursor:
+                    rows = await cursor.fetchall()
+            
+            for row in rows:
+                yield dict(row)
+            
+            if len(rows) < batch_size:
+                break
+            last = (rows[-1]['ts_us'], rows[-1]['id'])
+    
+    async def retire_partition(
+        self,
+        day: str,
+        start_us: int,
+        end_us: int,
+        state: str,
+        archive_path: Optional[str] = None,
+        archive_bytes: Optional[int] = None
+    ) -> Optional[Dict]:
+        """
+        Delete the rows of one day partition and record it in the catalog
+        Statistics, rollups and fingerprints keep counting the retired rows
+        """
+        async with self._writer() as db:
             async with db.execute("""
-                SELECT attack_type, COUNT(*) as count
+                SELECT COUNT(*), COALESCE(SUM(is_malicious), 0), MIN(id), MAX(id)
                 FROM attacks
-                WHERE is_malicious = 1 AND attack_type IS NOT NULL
-                GROUP BY attack_type
+                WHERE ts_us >= ? AND ts_us < ?
+            """, (start_us, end_us)) as cursor:
+                row_count, malicious_count, first_id, last_id = await cursor.fetchone()
+            if row_count == 0:
+                return None
+            
+            # One transaction: the guard row is never visible outside it, and
+            # _writer() rolls everything back if a step fails, so a leftover
+            # guard cannot disable the delete triggers
+            await db.execute("INSERT INTO retention_guard (id) VALUES (1)")
+            await db.execute(
+                "DELETE FROM attacks WHERE ts_us >= ? AND ts_us < ?", (start_us, end_us)
+            )
+            await db.execute("DELETE FROM retention_guard")
+            
+            partition = {
+                'day': day,
+                'start_us': start_us,
+                'end_us': end_us,
+                'first_id': first_id,
+                'last_id': last_id,
+                'row_count': row_count,
+                'malicious_count': malicious_count,
+                'state': state,
+                'archive_path': archive_path,
+                'archive_bytes': archive_bytes,
+                'retired_at_us': now_us(),
+            }
+            await db.execute(f"""
+                INSERT INTO attack_partitions ({', '.join(partition)})
+                VALUES ({', '.join('?' * len(partition))})
+            """, tuple(partition.values()))
+            
+            await db.commit()
+            return partition
+    
+    async def get_partitions(
+        self,
+        before_id: Optional[int] = None,
+        state: Optional[str] = None
+    ) -> List[Dict]:
+        """Retired partitions, newest first, optionally only those holding ids below before_id"""
+        async with self._reader() as db:
+            async with db.execute("""
+                SELECT day, first_id, last_id, row_count, malicious_count,
+                       state, archive_path, archive_bytes, retired_at_us
+                FROM attack_partitions
+                WHERE first_id < ? AND (? IS NULL OR state = ?)
+                ORDER BY last_id DESC
+            """, (before_id if before_id is not None else MAX_ROW_ID, state, state)) as cursor:
+                rows = await cursor.fetchall()
+                partitions = []
+                for row in rows:
+                    partition = dict(row)
+                    partition['retired_at'] = us_to_iso(partition.pop('retired_at_us'))
+                    partitions.append(partition)
+                return partitions
+    
+    async def get_statistics(self) -> Dict:
+        """Get attack statistics (O(1): read from trigger-maintained totals)"""
+        async with self._reader() as db:
+            async with db.execute("""
+                SELECT total_queries, malicious_queries, malicious_confidence_sum
+                FROM attack_summary
+                WHERE id = 1
+            """) as cursor:
+                row = await cursor.fetchone()
+            total_queries, malicious_queries, confidence_sum = row if row else (0, 0, 0.0)
+            
+            # Attack type distribution (one row per attack type)
+            async with db.execute("""
+                SELECT t.name, c.count
+                FROM attack_type_counts c
+                JOIN attack_types t ON t.id = c.attack_type_id
             """) as cursor:
                 attack_types = {}
                 async for row in cursor:
                     attack_types[row[0]] = row[1]
             
+            avg_confidence = (confidence_sum / malicious_queries) if malicious_queries > 0 else 0.0
             detection_rate = (malicious_queries / total_queries * 100) if total_queries > 0 else 0
             
             return {
@@ -133,20 +785,48 @@ class Database:
                 'attack_type_distribution': attack_types
             }
     
-    async def get_attack_timeline(self, hours: int = 24) -> List[Dict]:
-        """Get attack timeline for visualization"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+    async def get_attack_timeline(self, hours: int = 24, bucket: str = 'hour') -> List[Dict]:
+        """
+        Get attack timeline for visualization from the rollup tables
+        bucket: 'minute', 'hour' or 'day'; cost is proportional to the
+        number of buckets returned. The oldest bucket is counted whole.
+        """
+        if bucket not in TIMELINE_BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}', expected one of {list(TIMELINE_BUCKETS)}")
+        seconds = TIMELINE_BUCKETS[bucket]
+        since = (int(time.time()) - hours * 3600) // seconds * seconds
+        
+        async with self._reader() as db:
+            async with db.execute(f"""
+                SELECT
+                    strftime('%Y-%m-%dT%H:%M:%SZ', bucket, 'unixepoch') as bucket,
+                    count,
+                    malicious_count
+                FROM attack_rollup_{bucket}
+                WHERE bucket >= ?
+                ORDER BY bucket
+            """, (since,)) as cursor:
+                rows = await cursor.fetchall()
+                # 'hour' is the bucket start, kept for existing dashboard clients
+                return [{'hour': row['bucket'], **dict(row)} for row in rows]
+    
+    async def get_top_fingerprints(self, limit: int = 50) -> List[Dict]:
+        """Get the most frequent query fingerprints"""
+        async with self._reader() as db:
             async with db.execute("""
-                SELECT 
-                    strftime('%Y-%m-%d %H:00:00', timestamp) as hour,
-                    COUNT(*) as count,
-                    SUM(CASE WHEN is_malicious = 1 THEN 1 ELSE 0 END) as malicious_count
-                FROM attacks
-                WHERE datetime(timestamp) >= datetime('now', '-' || ? || ' hours')
-                GROUP BY hour
-                ORDER BY hour
-            """, (hours,)) as cursor:
+                SELECT fingerprint, count, malicious_count, first_seen_us, last_seen_us
+                FROM fingerprints
+                ORDER BY count DESC
+                LIMIT ?
+            """, (limit,)) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
-
+                return [
+                    {
+                        'fingerprint': row['fingerprint'],
+                        'count': row['count'],
+                        'malicious_count': row['malicious_count'],
+                        'first_seen': us_to_iso(row['first_seen_us']),
+                        'last_seen': us_to_iso(row['last_seen_us']),
+                    }
+                    for row in rows
+                ]
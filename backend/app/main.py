@@ -2,12 +2,18 @@
 FastAPI Main Application
 SQL Injection Detection System
 """
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from . import startup
 
-from .api.routes import router, database
-from .services.ml_detector import MLDetector
+with startup.phase('import'):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from contextlib import asynccontextmanager
+    
+    from .api.routes import (
+        router, database, knowledge_base, detection_executor, retention, manager,
+        live_stats, model_registry, control
+    )
+    from . import config
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -16,24 +22,44 @@ async def lifespan(app: FastAPI):
     print("Starting SQL Injection Detection System...")
     
     # Initialize database
-    await database.initialize()
+    with startup.phase('database init'):
+        await database.initialize()
+        await knowledge_base.start()
+    with startup.phase('background tasks'):
+        # serve.py turns this off in all but one worker
+        if getattr(app.state, 'background_maintenance', True):
+            await retention.start()
+        await live_stats.start()
     print("✓ Database initialized")
     
-    # Load ML model
-    try:
-        ml_detector = MLDetector(model_path='app/models/rf_detector.pkl')
-        print("✓ ML model loaded")
-    except Exception as e:
-        print(f"⚠ Warning: Could not load ML model: {e}")
+    # ML model (loaded once, when the routes module was imported)
+    active_model = model_registry.active
+    if active_model is not None:
+        print(f"✓ ML model {active_model['version']} loaded from {active_model['path']}")
+    else:
+        print("⚠ Warning: No ML model loaded")
         print("  Run 'python train_model.py' to train the model first")
+    await model_registry.start()
+    # Set by serve.py: reloads, rollbacks and cache clears reach every worker
+    await control.start(getattr(app.state, 'control_log', None))
     
     print("✓ System ready!")
+    if config.STARTUP_TIMING:
+        startup.print_report()
     print("="*60)
     
     yield
     
     # Shutdown
     print("Shutting down...")
+    await control.close()
+    await model_registry.close()
+    await live_stats.close()
+    await manager.close()
+    detection_executor.shutdown()
+    await retention.close()
+    await knowledge_base.close()
+    await database.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -50,6 +76,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor of /api/attacks, read by the dashboard
+    expose_headers=["X-Next-Before-Id"],
 )
 
 # Include API routes
@@ -64,10 +92,19 @@ async def root():
         "status": "operational",
         "endpoints": {
             "detect": "/api/detect",
+            "detect_batch": "/api/detect/batch",
             "attacks": "/api/attacks",
+            "attacks_export": "/api/attacks/export",
             "stats": "/api/stats",
             "timeline": "/api/timeline",
             "patterns": "/api/patterns",
+            "fingerprints": "/api/fingerprints",
+            "cache": "/api/cache",
+            "executor": "/api/executor",
+            "writes": "/api/writes",
+            "retention": "/api/retention",
+            "broadcast": "/api/broadcast",
+            "model": "/api/model",
             "websocket": "/api/ws"
         }
     }
@@ -0,0 +1,68 @@
+"""
+Attack Type Classifier
+Keyword fallback for models without a trained attack-type head: queries are
+tokenized once and every attack type is scored in one matrix product, so
+'or' no longer matches inside 'information' or 'random'
+"""
+import re
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+# Keyword tokens per attack type; on a tie the earlier type wins
+ATTACK_TYPE_KEYWORDS: Dict[str, List[str]] = {
+    'union_based': ['union', 'select'],
+    'error_based': ['extractvalue', 'updatexml', 'cast'],
+    'boolean_blind': ['and', 'or', '='],
+    'time_based': ['sleep', 'waitfor', 'benchmark'],
+    'second_order': ['insert', 'update', 'drop', 'grant'],
+    'nosql': ['||', '&&', 'match'],
+}
+
+UNKNOWN_ATTACK_TYPE = 'unknown'
+
+# Identifiers, plus the operator keywords
+TOKEN_PATTERN = re.compile(r"[a-z_@$][a-z0-9_@$]*|\|\||&&|=")
+
+class AttackTypeClassifier:
+    def __init__(self, keywords: Dict[str, List[str]] = ATTACK_TYPE_KEYWORDS):
+        self.attack_types = list(keywords)
+        self.vocabulary: Dict[str, int] = {}
+        for attack_type in keywords.values():
+            for keyword in attack_type:
+                self.vocabulary.setdefault(keyword, len(self.vocabulary))
+
+        # weights[keyword, type] = 1 when the keyword counts towards the type
+        self._weights = np.zeros((len(self.vocabulary), len(self.attack_types)), dtype=np.int32)
+        for column, attack_type in enumerate(self.attack_types):
+            for keyword in keywords[attack_type]:
+                self._weights[self.vocabulary[keyword], column] = 1
+
+    def _keyword_ids(self, query: str) -> List[int]:
+        """Vocabulary ids of the distinct keywords in query"""
+        vocabulary = self.vocabulary
+        tokens = set(TOKEN_PATTERN.findall(query.lower()))
+        return [vocabulary[token] for token in tokens if token in vocabulary]
+
+    def classify(self, query: str) -> str:
+        """Attack type with the most matching keywords, or 'unknown'"""
+        return self.classify_many([query])[0]
+
+    def classify_many(self, queries: Iterable[str]) -> List[str]:
+        """Label a batch of queries with one scoring pass"""
+        rows = [self._keyword_ids(query) for query in queries]
+        if not rows:
+            return []
+
+        # One presence matrix for the batch, scored against every type at once
+        present = np.zeros((len(rows), len(self.vocabulary)), dtype=np.int32)
+        for row, keyword_ids in enumerate(rows):
+            present[row, keyword_ids] = 1
+        scores = present @ self._weights
+
+        # argmax keeps the first of tied types, as the keyword order intends
+        best = np.argmax(scores, axis=1)
+        return [
+            self.attack_types[column] if scores[row, column] > 0 else UNKNOWN_ATTACK_TYPE
+            for row, column in enumerate(best)
+        ]
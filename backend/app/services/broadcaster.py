@@ -0,0 +1,295 @@
+"""
+WebSocket Broadcaster
+Fan-out of live events to dashboard clients without blocking the sender:
+each event is JSON-encoded once, queued per client in a bounded buffer and
+written by that client's own task, so one slow socket never delays a
+detection response or the other clients. Clients may subscribe to topics
+and filter attack events; matching goes through per-filter indices.
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket
+
+# RFC 6455 close codes: evicted for falling behind / server shutting down
+SLOW_CLIENT_CLOSE_CODE = 1013
+GOING_AWAY_CLOSE_CODE = 1001
+
+# 'attacks': attack_detected events (filterable), 'stats': stats_update pushes
+TOPICS = ('attacks', 'stats')
+
+class _Client:
+    """One connected socket: pending messages and the task that writes them"""
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.pending: Deque[str] = deque()
+        self.ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+
+        # Subscription; the defaults receive everything
+        self.topics: Set[str] = set(TOPICS)
+        self.attack_types: Optional[Set[str]] = None
+        self.min_confidence = 0.0
+        self.source_ip_prefix = ''
+        self.sample_rate = 1.0
+        self._sample_credit = 0.0
+
+        self.sent = 0
+        self.dropped = 0
+        self.dropped_since_send = 0
+
+    def sampled(self) -> bool:
+        """Deterministic sampling: lets through sample_rate of matching events"""
+        if self.sample_rate >= 1.0:
+            return True
+        self._sample_credit += self.sample_rate
+        if self._sample_credit >= 1.0:
+            self._sample_credit -= 1.0
+            return True
+        return False
+
+    def offer(self, text: str):
+        """Queue a message; never waits"""
+        if len(self.pending) >= self.queue_size:
+            # Drop-oldest: the newest events matter most on a live dashboard
+            self.pending.popleft()
+            self.dropped += 1
+            self.dropped_since_send += 1
+
+        self.pending.append(text)
+        self.ready.set()
+
+    async def next_message(self) -> str:
+        while not self.pending:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.pending.popleft()
+
+class Broadcaster:
+    def __init__(
+        self,
+        queue_size: int = 256,
+        send_timeout: float = 5.0,
+        max_dropped: int = 1024
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.max_dropped = max_dropped
+        self._clients: Dict[WebSocket, _Client] = {}
+
+        # Subscription indices, updated on subscribe/disconnect
+        self._by_topic: Dict[str, Set[_Client]] = {topic: set() for topic in TOPICS}
+        self._by_attack_type: Dict[Optional[str], Set[_Client]] = {}  # None: any type
+        self._by_ip_prefix: Dict[str, Set[_Client]] = {}  # '': any address
+        self._ip_prefix_lengths: Set[int] = set()
+
+        self.events = 0
+        self.filtered = 0
+        self.evicted = 0
+        # Totals of clients that have already left
+        self._closed_sent = 0
+        self._closed_dropped = 0
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    async def connect(self, websocket: WebSocket):
+        """Accept the socket and start its writer task"""
+        await websocket.accept()
+        client = _Client(websocket, self.queue_size)
+        client.writer = asyncio.create_task(self._write_loop(client))
+        self._clients[websocket] = client
+        self._index(client)
+
+    def _index(self, client: _Client):
+        for topic in client.topics:
+            self._by_topic[topic].add(client)
+        for attack_type in (client.attack_types or [None]):
+            self._by_attack_type.setdefault(attack_type, set()).add(client)
+        self._by_ip_prefix.setdefault(client.source_ip_prefix, set()).add(client)
+        self._ip_prefix_lengths.add(len(client.source_ip_prefix))
+
+    def _unindex(self, client: _Client):
+        for topic in client.topics:
+            self._by_topic[topic].discard(client)
+        for attack_type in (client.attack_types or [None]):
+            clients = self._by_attack_type.get(attack_type)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self._by_attack_type[attack_type]
+        clients = self._by_ip_prefix.get(client.source_ip_prefix)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del self._by_ip_prefix[client.source_ip_prefix]
+                self._ip_prefix_lengths = {len(prefix) for prefix in self._by_ip_prefix}
+
+    def subscribe(
+        self,
+        websocket: WebSocket,
+        topics: Iterable[str] = TOPICS,
+        attack_types: Optional[Iterable[str]] = None,
+        min_confidence: float = 0.0,
+        source_ip_prefix: str = '',
+        sample_rate: float = 1.0
+    ):
+        """Replace a client's topics and attack-event filters"""
+        client = self._clients.get(websocket)
+        if client is None:
+            return
+
+        self._unindex(client)
+        client.topics = set(topics)
+        client.attack_types = set(attack_types) if attack_types else None
+        client.min_confidence = min_confidence
+        client.source_ip_prefix = source_ip_prefix
+        client.sample_rate = sample_rate
+        client._sample_credit = 0.0
+        self._index(client)
+
+    def disconnect(self, websocket: WebSocket):
+        """Forget a socket and stop its writer task"""
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        self._unindex(client)
+
+        self._closed_sent += client.sent
+        self._closed_dropped += client.dropped
+        if client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def broadcast(self, message: dict, topic: str = 'stats'):
+        """Queue a message for every client subscribed to topic; returns immediately"""
+        clients = self._by_topic[topic]
+        if not clients:
+            return
+
+        text = json.dumps(message)
+        self.events += 1
+        self._offer(clients, text)
+
+    def publish_attack(
+        self,
+        message: dict,
+        attack_type: Optional[str],
+        confidence: float,
+        source_ip: Optional[str] = None
+    ):
+        """
+        Queue an attack event for the clients whose filters match it
+        Candidates come from the attack-type and source-IP prefix indices,
+        so the cost follows the number of interested clients, not all of them
+        """
+        self.events += 1
+        address = source_ip or ''
+
+        # Every client sits in exactly one set of each index that can match
+        type_sets = [
+            clients for clients in (
+                self._by_attack_type.get(None),
+                self._by_attack_type.get(attack_type) if attack_type is not None else None,
+            ) if clients
+        ]
+        prefix_sets = [
+            clients for clients in (
+                self._by_ip_prefix.get(address[:length])
+                for length in self._ip_prefix_lengths if length <= len(address)
+            ) if clients
+        ]
+        if not type_sets or not prefix_sets:
+            self.filtered += len(self._clients)
+            return
+
+        # Walk the smaller side and check the other filters on those clients only
+        if sum(map(len, type_sets)) <= sum(map(len, prefix_sets)):
+            candidates = (client for clients in type_sets for client in clients
+                          if address.startswith(client.source_ip_prefix))
+        else:
+            candidates = (client for clients in prefix_sets for client in clients
+                          if client.attack_types is None or attack_type in client.attack_types)
+
+        subscribed = self._by_topic['attacks']
+        matched = [
+            client for client in candidates
+            if client in subscribed and confidence >= client.min_confidence and client.sampled()
+        ]
+        self.filtered += len(self._clients) - len(matched)
+        if not matched:
+            return
+
+        # Serialized only when at least one client wants it
+        self._offer(matched, json.dumps(message))
+
+    def _offer(self, clients: Iterable[_Client], text: str):
+        for client in list(clients):
+            client.offer(text)
+            if client.dropped_since_send > self.max_dropped:
+                self._evict(client, "too slow")
+
+    def subscribed(self, websocket: WebSocket, topic: str) -> bool:
+        """Whether a connected client currently receives topic"""
+        client = self._clients.get(websocket)
+        return client is not None and topic in client.topics
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for one client (e.g. a reply) behind its pending events"""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.offer(json.dumps(message))
+
+    def _evict(self, client: _Client, reason: str):
+        if self._clients.get(client.websocket) is not client:
+            return
+        self.evicted += 1
+        self.disconnect(client.websocket)
+        print(f"⚠ Evicted WebSocket client ({reason}, {client.dropped} events dropped)")
+        asyncio.create_task(self._close(client.websocket, SLOW_CLIENT_CLOSE_CODE))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            # Already closed by the peer
+            pass
+
+    async def _write_loop(self, client: _Client):
+        try:
+            while True:
+                text = await client.next_message()
+                await asyncio.wait_for(client.websocket.send_text(text), self.send_timeout)
+                client.sent += 1
+                client.dropped_since_send = 0
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._evict(client, f"send took over {self.send_timeout}s")
+        except Exception as e:
+            # Dead socket: drop it instead of keeping it around
+            self._evict(client, f"send failed: {type(e).__name__}")
+
+    async def close(self):
+        """Stop every writer task and close the sockets"""
+        for client in list(self._clients.values()):
+            self.disconnect(client.websocket)
+            await self._close(client.websocket, GOING_AWAY_CLOSE_CODE)
+
+    def get_stats(self) -> Dict:
+        """Get fan-out counters"""
+        clients = list(self._clients.values())
+        return {
+            'clients': len(clients),
+            'queue_size': self.queue_size,
+            'events': self.events,
+            'queued': sum(len(client.pending) for client in clients),
+            'sent': self._closed_sent + sum(client.sent for client in clients),
+            'dropped': self._closed_dropped + sum(client.dropped for client in clients),
+            'evicted': self.evicted,
+            'filtered': self.filtered,
+        }
@@ -0,0 +1,192 @@
+"""
+Compiled Random Forest
+Flat array-backed inference engine for trained RandomForestClassifier models
+"""
+import json
+import numpy as np
+from typing import Dict, Optional
+
+# Layout of the .npz files written by earlier releases (still readable)
+FORMAT_VERSION = 1
+
+class CompiledForest:
+    """
+    All trees of a forest flattened into contiguous node arrays.
+
+    Leaves point to themselves, so a batch is evaluated by stepping every
+    (sample, tree) pair max_depth times without any per-node branching.
+    Probabilities match RandomForestClassifier.predict_proba.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int,
+        n_features: int,
+        metadata: Optional[Dict] = None
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        # Interleaved (right, left) children so one gather picks the branch;
+        # stored this way so a memory-mapped forest needs no per-process copy
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.metadata = dict(metadata or {})
+
+    @staticmethod
+    def _interleave(children_left: np.ndarray, children_right: np.ndarray) -> np.ndarray:
+        return np.stack([children_right, children_left], axis=1).ravel()
+
+    @property
+    def children_left(self) -> np.ndarray:
+        return self.children[1::2]
+
+    @property
+    def children_right(self) -> np.ndarray:
+        return self.children[0::2]
+
+    @classmethod
+    def from_sklearn(cls, model) -> 'CompiledForest':
+        """Flatten a fitted RandomForestClassifier"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves and test a dummy feature
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+            left = np.where(is_leaf, node_ids, tree.children_left).astype(np.int32)
+            right = np.where(is_leaf, node_ids, tree.children_right).astype(np.int32)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+
+            features.append(feature)
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left + offset)
+            rights.append(right + offset)
+            values.append(proba)
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=cls._interleave(np.concatenate(lefts), np.concatenate(rights)),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=cls._plain_classes(model.classes_),
+            max_depth=max_depth,
+            n_features=model.n_features_in_
+        )
+
+    @staticmethod
+    def _plain_classes(classes) -> np.ndarray:
+        """String labels come as an object array, which .npz cannot hold without pickle"""
+        classes = np.asarray(classes)
+        return classes.astype(str) if classes.dtype == object else classes
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf reached in every tree, shape (n_samples, n_trees)"""
+        # Trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.intp) * n_features)[:, np.newaxis]
+        nodes = np.repeat(self.roots[np.newaxis, :].astype(np.intp), n_samples, axis=0)
+
+        for _ in range(self.max_depth):
+            values = np.take(flat_X, row_offsets + np.take(self.feature, nodes))
+            go_left = values <= np.take(self.threshold, nodes)
+            nodes = np.take(self.children, 2 * nodes + go_left)
+
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Average per-tree class probabilities"""
+        leaves = self.apply(X)
+
+        # Accumulate tree by tree, in the same order as sklearn
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        for tree_index in range(leaves.shape[1]):
+            proba += self.value[leaves[:, tree_index]]
+        proba /= leaves.shape[1]
+
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict class labels"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Every array needed to rebuild the forest (see model_artifact)"""
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'value': self.value,
+            'roots': self.roots,
+            'classes': self.classes_,
+            'max_depth': np.array([self.max_depth], dtype=np.int32),
+            'n_features': np.array([self.n_features_in_], dtype=np.int32),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], metadata: Optional[Dict] = None) -> 'CompiledForest':
+        """Rebuild a forest around arrays from to_arrays(), without copying them"""
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            children=arrays['children'],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            classes=arrays['classes'],
+            max_depth=int(arrays['max_depth'][0]),
+            n_features=int(arrays['n_features'][0]),
+            metadata=metadata
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledForest':
+        """Load a compiled forest from an .npz file written by an earlier release"""
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported compiled model format {version} "
+                    f"(expected {FORMAT_VERSION})"
+                )
+
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                children=cls._interleave(data['children_left'], data['children_right']),
+                value=data['value'],
+                roots=data['roots'],
+                classes=data['classes'],
+                max_depth=int(data['max_depth']),
+                n_features=int(data['n_features']),
+                metadata=json.loads(str(data['metadata'])) if 'metadata' in data else {}
+            )
@@ -0,0 +1,82 @@
+"""
+Worker Control Channel
+Admin actions (model reload and rollback, cache clear) for the workers of a
+pre-fork server: the worker that handled the request appends the action to
+a log shared by all workers and signals the master, which signals every
+worker to apply the entries it has not applied yet. Without serve.py there
+is no log and actions stay local.
+"""
+import asyncio
+import inspect
+import json
+import os
+import signal
+from typing import Callable, Dict, Optional
+
+# Sent by a worker to the master, and by the master to every worker
+CONTROL_SIGNAL = signal.SIGUSR2
+
+class ControlChannel:
+    def __init__(self):
+        self.log_path: Optional[str] = None
+        self._handlers: Dict[str, Callable] = {}
+        self._offset = 0
+        self._lock = asyncio.Lock()
+        self.published = 0
+        self.applied = 0
+        self.failures = 0
+
+    def register(self, action: str, handler: Callable):
+        """handler(entry) applies an action published by another worker (may be async)"""
+        self._handlers[action] = handler
+
+    async def start(self, log_path: Optional[str]):
+        """Apply what earlier workers logged, then follow the master's signals"""
+        self.log_path = log_path
+        if log_path is None:
+            return
+        # A respawned worker starts from the master's state: replay everything
+        await self.apply_pending()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(CONTROL_SIGNAL, lambda: asyncio.ensure_future(self.apply_pending()))
+
+    async def close(self):
+        if self.log_path is not None:
+            asyncio.get_running_loop().remove_signal_handler(CONTROL_SIGNAL)
+
+    def publish(self, action: str, **params):
+        """Log an action this worker already applied, for the others to follow"""
+        if self.log_path is None:
+            return
+        line = json.dumps({'action': action, 'origin': os.getpid(), **params}) + '\n'
+        # One O_APPEND write per entry, so concurrent workers never interleave lines
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, line.encode('utf-8'))
+        finally:
+            os.close(fd)
+        self.published += 1
+        os.kill(os.getppid(), CONTROL_SIGNAL)
+
+    async def apply_pending(self):
+        """Apply the log entries published by other workers since the last call"""
+        async with self._lock:
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+            # A line still being written is picked up on the next signal
+            complete = data[:data.rfind(b'\n') + 1]
+            self._offset += len(complete)
+
+            for line in complete.decode('utf-8').splitlines():
+                entry = json.loads(line)
+                if entry['origin'] == os.getpid():
+                    continue
+                try:
+                    result = self._handlers[entry['action']](entry)
+                    if inspect.isawaitable(result):
+                        await result
+                    self.applied += 1
+                except Exception as e:
+                    self.failures += 1
+                    print(f"⚠ Control action {entry['action']} failed: {e}")
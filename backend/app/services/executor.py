@@ -0,0 +1,171 @@
+"""
+Detection Executor
+Runs the CPU-bound detection pipeline off the event loop, on a bounded
+thread or process pool, and rejects work when the pool is saturated
+"""
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .pipeline import DetectionPipeline, init_worker, worker_analyze, worker_analyze_many
+
+EXECUTION_MODES = ('inline', 'thread', 'process')
+
+class ExecutorSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+class DetectionExecutor:
+    def __init__(
+        self,
+        pipeline: DetectionPipeline,
+        mode: str = 'thread',
+        max_workers: Optional[int] = None,
+        max_queue: int = 64,
+        model_path: Optional[str] = None
+    ):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{mode}', expected one of {EXECUTION_MODES}")
+
+        self.pipeline = pipeline
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.model_path = model_path
+        self._pool: Optional[Executor] = None
+
+        # Only touched from the event loop thread
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        # Process mode: verdict cache lookups in the pool workers, from their results
+        self.worker_cache_hits = 0
+        self.worker_cache_misses = 0
+
+    @property
+    def capacity(self) -> int:
+        """Requests that may be running or waiting at once"""
+        return self.max_workers + self.max_queue
+
+    def _get_pool(self) -> Executor:
+        # Created on first use so nothing is spawned at import time
+        if self._pool is None:
+            if self.mode == 'process':
+                cache = self.pipeline.verdict_cache
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=init_worker,
+                    initargs=(self.model_path, cache.max_size, cache.ttl_seconds)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='detect'
+                )
+        return self._pool
+
+    async def _submit(self, local_func, worker_func, *args):
+        if self.mode == 'inline':
+            result = local_func(*args)
+            self.completed += 1
+            return result
+
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise ExecutorSaturated(
+                f"Detection pool saturated ({self.in_flight} requests in flight)"
+            )
+
+        func = local_func
+        if self.mode == 'process':
+            # Pool workers have caches of their own: an invalidation of the
+            # parent cache reaches them through its generation
+            func = worker_func
+            args = (*args, self.pipeline.verdict_cache.generation)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def analyze(self, query: str) -> Dict:
+        """Run detection for one query on the pool"""
+        verdict = await self._submit(self.pipeline.analyze, worker_analyze, query)
+        self._count_worker_cache([verdict])
+        return verdict
+
+    async def analyze_many(self, queries: List[str]) -> List[Dict]:
+        """Run batch detection on the pool (one pool slot per batch)"""
+        verdicts = await self._submit(self.pipeline.analyze_many, worker_analyze_many, queries)
+        self._count_worker_cache(verdicts)
+        return verdicts
+
+    def _count_worker_cache(self, verdicts: List[Dict]):
+        if self.mode != 'process':
+            return
+        hits = sum(1 for verdict in verdicts if verdict['cached'])
+        self.worker_cache_hits += hits
+        self.worker_cache_misses += len(verdicts) - hits
+
+    def reload_workers(self, model_path: str):
+        """
+        Process mode: route new work to fresh workers that load model_path;
+        the old workers finish what they are running and exit
+        Thread and inline modes share the in-process model and need nothing
+        """
+        self.model_path = model_path
+        if self.mode != 'process' or self._pool is None:
+            return
+        old_pool, self._pool = self._pool, None
+        old_pool.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop the pool, letting submitted work finish"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def get_cache_stats(self) -> Dict:
+        """
+        Verdict cache counters of the caches that answer requests
+        Process mode: each worker has its own cache; only hits and misses
+        are collected (from the results), size and evictions stay unknown
+        """
+        stats = self.pipeline.verdict_cache.get_stats()
+        if self.mode != 'process':
+            return {**stats, 'scope': 'local'}
+
+        lookups = self.worker_cache_hits + self.worker_cache_misses
+        return {
+            **stats,
+            'scope': 'workers',
+            'size': None,
+            'hits': self.worker_cache_hits,
+            'misses': self.worker_cache_misses,
+            'hit_rate': (self.worker_cache_hits / lookups * 100) if lookups > 0 else 0.0,
+            'evictions': None,
+            'expirations': None,
+        }
+
+    def get_stats(self) -> Dict:
+        """Get pool and queue-depth counters"""
+        return {
+            'mode': self.mode,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'queue_depth': max(0, self.in_flight - self.max_workers),
+            'peak_in_flight': self.peak_in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'failed': self.failed,
+        }
@@ -0,0 +1,100 @@
+"""
+Feature Specification
+Single, versioned definition of the model's input features, shared by
+dataset generation (training) and the FeatureExtractor (serving)
+"""
+import hashlib
+import json
+from typing import Callable, List
+
+# Bump when a change to FEATURE_SPEC is intentional; any edit also changes the hash
+FEATURE_SPEC_VERSION = 1
+
+# (feature name, kind, patterns, match against lowercased query)
+# kind: 'length' -> len(query), 'count' -> occurrences of the pattern,
+#       'contains' -> 1 if any pattern occurs, else 0
+FEATURE_SPEC = [
+    ('length', 'length', (), False),
+    ('union_count', 'count', ('union',), True),
+    ('select_count', 'count', ('select',), True),
+    ('insert_count', 'count', ('insert',), True),
+    ('update_count', 'count', ('update',), True),
+    ('delete_count', 'count', ('delete',), True),
+    ('drop_count', 'count', ('drop',), True),
+    ('exec_count', 'count', ('exec',), True),
+    ('execute_count', 'count', ('execute',), True),
+    ('concat_count', 'count', ('concat',), True),
+    ('cast_count', 'count', ('cast',), True),
+    ('char_count', 'count', ('char',), True),
+    ('comment_dashes', 'count', ('--',), False),
+    ('comment_slash_star', 'count', ('/*',), False),
+    ('single_quote', 'count', ("'",), False),
+    ('double_quote', 'count', ('"',), False),
+    ('semicolon', 'count', (';',), False),
+    ('equals', 'count', ('=',), False),
+    ('or_keyword', 'count', (' or ',), True),
+    ('and_keyword', 'count', (' and ',), True),
+    ('sleep_count', 'count', ('sleep',), True),
+    ('benchmark_count', 'count', ('benchmark',), True),
+    ('waitfor_count', 'count', ('waitfor',), True),
+    ('information_schema', 'contains', ('information_schema',), True),
+    ('version_func', 'contains', ('version()', '@@version'), True),
+    ('database_func', 'contains', ('database()',), True),
+    ('user_func', 'contains', ('user()',), True),
+    ('has_hex', 'contains', ('0x',), True),
+]
+
+FEATURE_NAMES = [name for name, _, _, _ in FEATURE_SPEC]
+
+# Fingerprint of names, order and matching rules, stored with trained models
+FEATURE_SPEC_HASH = hashlib.sha256(
+    json.dumps(
+        {'version': FEATURE_SPEC_VERSION, 'features': FEATURE_SPEC},
+        separators=(',', ':')
+    ).encode('utf-8')
+).hexdigest()
+
+def compile_spec(spec: List[tuple]) -> Callable[[str], List[int]]:
+    """
+    Compile the feature spec into one straight-line function
+
+    The generated function lowercases the query once and evaluates every
+    feature with C-level str.count / `in` scans, returning the row in
+    feature order. A count pattern that contains an earlier count pattern
+    on the same text (e.g. 'execute' and 'exec') is only scanned when the
+    shorter one was found.
+    """
+    lines = ['def extract_row(query):', '    lowered = query.lower()']
+    counted = []  # (pattern, lowercase, variable) of count features seen so far
+    values = []
+
+    for index, (name, kind, patterns, lowercase) in enumerate(spec):
+        text = 'lowered' if lowercase else 'query'
+        variable = f'f{index}'
+
+        if kind == 'length':
+            expression = 'len(query)'
+        elif kind == 'count':
+            (pattern,) = patterns
+            expression = f'{text}.count({pattern!r})'
+            guards = [
+                guard_variable for guard, guard_lowercase, guard_variable in counted
+                if guard_lowercase == lowercase and guard in pattern
+            ]
+            if guards:
+                expression = f'({expression} if {" and ".join(guards)} else 0)'
+            counted.append((pattern, lowercase, variable))
+        elif kind == 'contains':
+            checks = ' or '.join(f'{pattern!r} in {text}' for pattern in patterns)
+            expression = f'(1 if {checks} else 0)'
+        else:
+            raise ValueError(f"Unknown feature kind '{kind}' for {name}")
+
+        lines.append(f'    {variable} = {expression}')
+        values.append(variable)
+
+    lines.append(f'    return [{", ".join(values)}]')
+
+    namespace = {}
+    exec(compile('\n'.join(lines), '<feature_spec>', 'exec'), namespace)
+    return namespace['extract_row']
@@ -2,13 +2,119 @@
 Knowledge Base Service
 Manages attack storage and pattern analysis
 """
-from typing import Dict, List, Optional
-from datetime import datetime
-from ..database.schema import Database
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+from ..database.schema import Database, now_us
+
+# How detections reach SQLite:
+#   'sync'  - insert and commit before the API responds
+#   'async' - write-behind buffer; records are dropped when the buffer is full
+#   'block' - write-behind buffer; callers wait for space instead of dropping
+WRITE_MODES = ('sync', 'async', 'block')
+
+# Queued by close() to end the flush loop
+_STOP = object()
 
 class KnowledgeBase:
-    def __init__(self, db: Database):
+    def __init__(
+        self,
+        db: Database,
+        write_mode: str = 'async',
+        buffer_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.05
+    ):
+        if write_mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write mode '{write_mode}', expected one of {WRITE_MODES}")
+        
         self.db = db
+        self.write_mode = write_mode
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        # Created by start() on the running event loop
+        self._buffer: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+    
+    async def start(self):
+        """Start the background writer (no-op in 'sync' mode)"""
+        if self.write_mode == 'sync' or self._flusher is not None:
+            return
+        
+        self._buffer = asyncio.Queue(maxsize=self.buffer_size)
+        self._flusher = asyncio.create_task(self._flush_loop())
+    
+    async def close(self):
+        """Write every buffered record, then stop the background writer"""
+        if self._flusher is None:
+            return
+        
+        # Stop after the batch in progress; cancelling could lose records
+        # already taken off the buffer
+        await self._buffer.put(_STOP)
+        await self._flusher
+        self._flusher = None
+        
+        while not self._buffer.empty():
+            await self._write_batch(self._drain())
+        self._buffer = None
+        
+        print(f"Knowledge base flushed ({self.written} records written, {self.dropped} dropped)")
+    
+    def _drain(self, batch: Optional[List[Dict]] = None) -> List[Dict]:
+        """Fill a batch up to batch_size from the buffer without waiting"""
+        batch = batch if batch is not None else []
+        while len(batch) < self.batch_size and not self._buffer.empty():
+            batch.append(self._buffer.get_nowait())
+        return batch
+    
+    async def _flush_loop(self):
+        """Group buffered records into one transaction by size or time"""
+        while True:
+            record = await self._buffer.get()
+            if record is _STOP:
+                return
+            
+            # Give a batch flush_interval to fill up unless it already has
+            if self._buffer.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_interval)
+            
+            batch = self._drain([record])
+            stopping = any(item is _STOP for item in batch)
+            if stopping:
+                batch = [item for item in batch if item is not _STOP]
+            await self._write_batch(batch)
+            if stopping:
+                return
+    
+    async def _write_batch(self, batch: List[Dict]):
+        if not batch:
+            return
+        try:
+            await self.db.insert_attacks(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"⚠ Warning: Could not write {len(batch)} detections: {e}")
+    
+    async def _enqueue(self, record: Dict):
+        if self.write_mode == 'block':
+            await self._buffer.put(record)
+        else:
+            try:
+                self._buffer.put_nowait(record)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                return
+        self.enqueued += 1
     
     async def store_detection(
         self,
@@ -19,35 +125,87 @@ class KnowledgeBase:
         attack_type: Optional[str] = None,
         source_ip: Optional[str] = None,
         user_agent: Optional[str] = None,
-        response_time_ms: Optional[float] = None
-    ) -> int:
-        """Store detection result in knowledge base"""
-        return await self.db.insert_attack(
-            query=query,
-            normalized_query=normalized_query,
-            is_malicious=is_malicious,
-            confidence=confidence,
-            attack_type=attack_type,
-            source_ip=source_ip,
-            user_agent=user_agent,
-            response_time_ms=response_time_ms
-        )
+        response_time_ms: Optional[float] = None,
+        fingerprint: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Store detection result in knowledge base
+        Returns the row id in 'sync' mode, None when the write is buffered
+        """
+        record = {
+            'ts_us': now_us(),
+            'query': query,
+            'normalized_query': normalized_query,
+            'is_malicious': is_malicious,
+            'confidence': confidence,
+            'attack_type': attack_type,
+            'source_ip': source_ip,
+            'user_agent': user_agent,
+            'response_time_ms': response_time_ms,
+            'fingerprint': fingerprint,
+        }
+        
+        if self._buffer is None:
+            return await self.db.insert_attack(**record)
+        
+        await self._enqueue(record)
+        return None
+    
+    async def store_detections(self, records: List[Dict]) -> int:
+        """Store a batch of detection results in knowledge base"""
+        if not records:
+            return 0
+        
+        if self._buffer is None:
+            return await self.db.insert_attacks(records)
+        
+        for record in records:
+            await self._enqueue(record)
+        return len(records)
+    
+    def get_write_stats(self) -> Dict:
+        """Get write-behind buffer counters"""
+        return {
+            'write_mode': self.write_mode,
+            'buffered': self._buffer.qsize() if self._buffer is not None else 0,
+            'buffer_size': self.buffer_size,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
+    
+    async def get_attack_history(self, limit: int = 100, before_id: Optional[int] = None) -> List[Dict]:
+        """Retrieve one page of attack history, newest first"""
+        return await self.db.get_recent_attacks(limit, before_id)
+    
+    def export_attacks(
+        self,
+        before_id: Optional[int] = None,
+        malicious_only: bool = False,
+        limit: Optional[int] = None,
+        include_archived: bool = False
+    ) -> AsyncIterator[Dict]:
+        """Stream attack history without loading it into memory"""
+        return self.db.iter_attacks(before_id, malicious_only, limit, include_archived)
     
-    async def get_attack_history(self, limit: int = 100) -> List[Dict]:
-        """Retrieve attack history"""
-        return await self.db.get_recent_attacks(limit)
+    async def get_fingerprints(self, limit: int = 50) -> List[Dict]:
+        """Get per-fingerprint detection counts"""
+        return await self.db.get_top_fingerprints(limit)
     
     async def get_statistics(self) -> Dict:
         """Get comprehensive statistics"""
         return await self.db.get_statistics()
     
-    async def get_timeline(self, hours: int = 24) -> List[Dict]:
-        """Get attack timeline"""
-        return await self.db.get_attack_timeline(hours)
+    async def get_timeline(self, hours: int = 24, bucket: str = 'hour') -> List[Dict]:
+        """Get attack timeline at minute, hour or day resolution"""
+        return await self.db.get_attack_timeline(hours, bucket)
     
-    async def analyze_patterns(self) -> Dict:
-        """Analyze attack patterns"""
-        stats = await self.get_statistics()
+    async def analyze_patterns(self, stats: Optional[Dict] = None) -> Dict:
+        """Analyze attack patterns (from stats already fetched, if given)"""
+        if stats is None:
+            stats = await self.get_statistics()
         
         # Basic pattern analysis
         patterns = {
@@ -0,0 +1,110 @@
+"""
+Live Statistics Service
+Computes dashboard statistics once per tick and pushes what changed to every
+WebSocket client, so database load does not grow with the number of
+open dashboards
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+from .broadcaster import Broadcaster
+from .knowledge_base import KnowledgeBase
+
+class LiveStatsPublisher:
+    def __init__(
+        self,
+        knowledge_base: KnowledgeBase,
+        broadcaster: Broadcaster,
+        interval_seconds: float = 1.0,
+        timeline_hours: int = 24,
+        timeline_bucket: str = 'hour'
+    ):
+        self.knowledge_base = knowledge_base
+        self.broadcaster = broadcaster
+        self.interval_seconds = interval_seconds
+        self.timeline_hours = timeline_hours
+        self.timeline_bucket = timeline_bucket
+        self._task: Optional[asyncio.Task] = None
+
+        # Last computed state, used for deltas and for new clients
+        self._stats: Optional[Dict] = None
+        self._patterns: Optional[Dict] = None
+        self._timeline: Dict[str, Dict] = {}
+        self.seq = 0
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Start the periodic publisher (no-op when the interval is 0)"""
+        if self.interval_seconds <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._publish_loop())
+
+    async def close(self):
+        """Stop the periodic publisher"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _publish_loop(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            # Nobody is watching: skip the queries entirely
+            if not self.broadcaster.client_count:
+                continue
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"⚠ Live stats update failed: {e}")
+
+    async def _refresh(self) -> Optional[List[Dict]]:
+        """Recompute stats; returns the changed timeline buckets, or None if nothing changed"""
+        stats = await self.knowledge_base.get_statistics()
+        patterns = await self.knowledge_base.analyze_patterns(stats)
+        timeline = await self.knowledge_base.get_timeline(self.timeline_hours, self.timeline_bucket)
+
+        changed = [row for row in timeline if self._timeline.get(row['bucket']) != row]
+        self._timeline = {row['bucket']: row for row in timeline}
+        stats_changed = stats != self._stats or patterns != self._patterns
+        self._stats, self._patterns = stats, patterns
+
+        if not (stats_changed or changed):
+            return None
+        self.seq += 1
+        return changed
+
+    def _message(self, timeline: List[Dict], full: bool) -> Dict:
+        return {
+            'type': 'stats_update',
+            'data': {
+                'seq': self.seq,
+                'full': full,
+                'stats': self._stats,
+                'patterns': self._patterns,
+                # full: the whole window; otherwise only buckets that changed
+                'timeline': timeline,
+                'timeline_bucket': self.timeline_bucket,
+            }
+        }
+
+    async def tick(self):
+        """Compute once and push a delta if anything changed"""
+        async with self._lock:
+            changed = await self._refresh()
+            if changed is not None:
+                self.broadcaster.broadcast(self._message(changed, full=False))
+
+    async def send_snapshot(self, websocket):
+        """Queue the full current state for a newly connected client"""
+        async with self._lock:
+            # Unsubscribed from stats (possibly while this waited for the lock)
+            if not self.broadcaster.subscribed(websocket, 'stats'):
+                return
+            if self._stats is None:
+                await self._refresh()
+            self.broadcaster.send(websocket, self._message(list(self._timeline.values()), full=True))
@@ -5,35 +5,96 @@ Uses Random Forest classifier for detection
 import pickle
 import numpy as np
 from pathlib import Path
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from typing import Tuple, Dict
+from typing import Callable, NamedTuple, Sequence, Tuple, Dict, List, Optional
+
+from .attack_classifier import AttackTypeClassifier
+from .compiled_forest import CompiledForest
+from .feature_spec import FEATURE_SPEC_VERSION, FEATURE_SPEC_HASH
+from . import model_artifact
+
+# Compiled models in the memory-mapped artifact format (see model_artifact)
+ARTIFACT_SUFFIX = '.forest'
+
+class ActiveModel(NamedTuple):
+    """Detector, attack-type head and feature spec that are swapped in together"""
+    model: object
+    attack_type_model: Optional[object]
+    feature_spec_hash: Optional[str]
 
 class MLDetector:
-    def __init__(self, model_path: str = None):
-        self.model = None
+    def __init__(self, model_path: str = None, decision_threshold: float = 0.5):
+        # Replaced as a whole, so a reader never pairs a detector with
+        # another model's attack-type head (the second head predicts the
+        # attack type from the same feature row)
+        self.active = ActiveModel(None, None, None)
         self.model_path = model_path
-        self.attack_type_keywords = {
-            'union_based': ['union', 'select'],
-            'error_based': ['extractvalue', 'updatexml', 'cast'],
-            'boolean_blind': ['and', 'or', '='],
-            'time_based': ['sleep', 'waitfor', 'benchmark'],
-            'second_order': ['insert', 'update', 'drop', 'grant'],
-            'nosql': ['||', '&&', 'match'],
-        }
+        self.decision_threshold = decision_threshold
+        self._reload_listeners: List[Callable[[], None]] = []
+        # Used when the model has no attack-type head
+        self.attack_classifier = AttackTypeClassifier()
         
         if model_path and Path(model_path).exists():
             self.load_model(model_path)
     
-    def train(self, X: np.ndarray, y: np.ndarray) -> Dict[str, float]:
-        """Train Random Forest classifier"""
+    @property
+    def model(self):
+        return self.active.model
+    
+    @model.setter
+    def model(self, model):
+        self.active = self.active._replace(model=model)
+    
+    @property
+    def attack_type_model(self):
+        return self.active.attack_type_model
+    
+    @attack_type_model.setter
+    def attack_type_model(self, attack_type_model):
+        self.active = self.active._replace(attack_type_model=attack_type_model)
+    
+    @property
+    def feature_spec_hash(self) -> Optional[str]:
+        return self.active.feature_spec_hash
+    
+    @feature_spec_hash.setter
+    def feature_spec_hash(self, spec_hash: Optional[str]):
+        self.active = self.active._replace(feature_spec_hash=spec_hash)
+    
+    def train(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        attack_types: Optional[np.ndarray] = None,
+        attack_type_names: Optional[Sequence[str]] = None,
+        max_train_samples: Optional[int] = None
+    ) -> Dict[str, float]:
+        """
+        Train Random Forest classifier (and the attack-type head, given labels)
+        attack_types: per-sample names, or codes into attack_type_names
+        X may be memory-mapped: the forest needs its training rows in memory,
+        so those are copied (at most max_train_samples of them), while the
+        test rows are read a chunk at a time
+        """
+        # Training-only imports: serving a compiled model never loads sklearn
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+        
         print("Training ML model...")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+        # Split data (indices, so the attack-type head uses the same split)
+        train_index, test_index = train_test_split(
+            np.arange(len(y)), test_size=0.2, random_state=42, stratify=y
         )
+        if max_train_samples is not None and len(train_index) > max_train_samples:
+            train_index, _ = train_test_split(
+                train_index, train_size=max_train_samples, random_state=42, stratify=y[train_index]
+            )
+        # Sorted, so rows are read from a memory-mapped X front to back
+        train_index.sort()
+        test_index.sort()
+        X_train = np.asarray(X[train_index], dtype=np.float32)
+        y_train, y_test = np.asarray(y[train_index]), np.asarray(y[test_index])
         
         # Train model
         self.model = RandomForestClassifier(
@@ -44,17 +105,18 @@ class MLDetector:
         )
         
         self.model.fit(X_train, y_train)
+        self.feature_spec_hash = FEATURE_SPEC_HASH
         
         # Evaluate
-        y_pred = self.model.predict(X_test)
+        y_pred = self._predict_chunked(self.model, X, test_index)
         
         metrics = {
             'accuracy': accuracy_score(y_test, y_pred),
             'precision': precision_score(y_test, y_pred),
             'recall': recall_score(y_test, y_pred),
             'f1_score': f1_score(y_test, y_pred),
-            'train_samples': len(X_train),
-            'test_samples': len(X_test),
+            'train_samples': len(train_index),
+            'test_samples': len(test_index),
         }
         
         print(f"Model trained successfully!")
@@ -63,44 +125,137 @@ class MLDetector:
         print(f"Recall: {metrics['recall']:.4f}")
         print(f"F1 Score: {metrics['f1_score']:.4f}")
         
+        self.attack_type_model = None
+        if attack_types is not None:
+            metrics['attack_type_accuracy'] = self._train_attack_type_head(
+                X, X_train, y_train, y_test, attack_types, attack_type_names, train_index, test_index
+            )
+            print(f"Attack type accuracy: {metrics['attack_type_accuracy']:.4f}")
+        
         return metrics
     
-    def predict(self, features: np.ndarray) -> Tuple[bool, float]:
+    @staticmethod
+    def _predict_chunked(model, X: np.ndarray, index: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """model.predict(X[index]) without copying all the rows at once"""
+        if len(index) == 0:
+            return np.empty(0)
+        return np.concatenate([
+            model.predict(np.asarray(X[index[start:start + chunk_size]], dtype=np.float32))
+            for start in range(0, len(index), chunk_size)
+        ])
+    
+    def _train_attack_type_head(
+        self,
+        X: np.ndarray,
+        X_train: np.ndarray,
+        y_train: np.ndarray,
+        y_test: np.ndarray,
+        attack_types: np.ndarray,
+        attack_type_names: Optional[Sequence[str]],
+        train_index: np.ndarray,
+        test_index: np.ndarray
+    ) -> float:
+        """Fit the attack-type forest on the malicious training rows"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import accuracy_score
+        
+        def labels(index: np.ndarray) -> np.ndarray:
+            # Names only for the rows used, never for the whole dataset
+            values = np.asarray(attack_types[index])
+            if attack_type_names is None:
+                return values
+            return np.asarray(attack_type_names, dtype=object)[values]
+        
+        malicious = y_train == 1
+        test_index = test_index[y_test == 1]
+        
+        self.attack_type_model = RandomForestClassifier(
+            n_estimators=50,
+            max_depth=12,
+            random_state=42,
+            n_jobs=-1
+        )
+        self.attack_type_model.fit(X_train[malicious], labels(train_index[malicious]))
+        
+        if len(test_index) == 0:
+            return float('nan')
+        predicted = self._predict_chunked(self.attack_type_model, X, test_index)
+        return accuracy_score(labels(test_index), predicted)
+    
+    def predict(self, features: np.ndarray, active: Optional[ActiveModel] = None) -> Tuple[bool, float]:
         """
         Predict if query is malicious
         Returns: (is_malicious, confidence)
         """
-        if self.model is None:
+        is_malicious, confidence = self.predict_many(features, active=active)
+        return bool(is_malicious[0]), float(confidence[0])
+    
+    def predict_many(
+        self, features: np.ndarray, threshold: Optional[float] = None,
+        active: Optional[ActiveModel] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict a batch of queries from a single predict_proba pass
+        A query is malicious when P(malicious) > threshold (defaults to
+        decision_threshold; 0.5 matches model.predict)
+        active: the models to use, read once by callers that also label types
+        Returns: (is_malicious, confidence) arrays of shape (n_samples,)
+        """
+        # Read once: a hot reload may swap self.active mid-call
+        model = (active or self.active).model
+        if model is None:
             raise ValueError("Model not trained or loaded")
         
-        # Reshape if single sample
-        if len(features.shape) == 1:
+        if threshold is None:
+            threshold = self.decision_threshold
+        
+        # Trees split on float32 features; converting here avoids a copy later
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
             features = features.reshape(1, -1)
         
-        # Get prediction and probability
-        prediction = self.model.predict(features)[0]
-        probabilities = self.model.predict_proba(features)[0]
+        probabilities = model.predict_proba(features)
+        malicious_column = self._malicious_column(model)
+        malicious_proba = probabilities[:, malicious_column]
+        benign_proba = probabilities[:, 1 - malicious_column]
         
-        is_malicious = bool(prediction == 1)
-        confidence = float(probabilities[1] if is_malicious else probabilities[0])
+        is_malicious = malicious_proba > threshold
+        confidence = np.where(is_malicious, malicious_proba, benign_proba)
         
         return is_malicious, confidence
     
-    def identify_attack_type(self, query: str) -> str:
-        """Identify specific attack type based on keywords"""
-        query_lower = query.lower()
-        
-        scores = {}
-        for attack_type, keywords in self.attack_type_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in query_lower)
-            if score > 0:
-                scores[attack_type] = score
+    @staticmethod
+    def _malicious_column(model) -> int:
+        """Column of the malicious class in predict_proba output"""
+        return int(np.flatnonzero(model.classes_ == 1)[0])
+    
+    def identify_attack_type(
+        self, query: str, features: Optional[np.ndarray] = None, active: Optional[ActiveModel] = None
+    ) -> str:
+        """Identify specific attack type (from the feature row when the model has a head)"""
+        return self.identify_attack_types([query], features, active)[0]
+    
+    def identify_attack_types(
+        self, queries: Sequence[str], features: Optional[np.ndarray] = None,
+        active: Optional[ActiveModel] = None
+    ) -> List[str]:
+        """
+        Label a batch of malicious queries in one pass
+        The attack-type head reuses the detection feature rows; models
+        without one (or callers without features) fall back to keywords
+        """
+        if len(queries) == 0:
+            return []
         
-        if not scores:
-            return 'unknown'
+        # Read once: a hot reload may swap self.active mid-call
+        attack_type_model = (active or self.active).attack_type_model
+        if attack_type_model is None or features is None:
+            return self.attack_classifier.classify_many(queries)
         
-        # Return attack type with highest score
-        return max(scores.items(), key=lambda x: x[1])[0]
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        return [str(label) for label in attack_type_model.predict(features)]
     
     def save_model(self, path: str):
         """Save trained model to disk"""
@@ -109,15 +264,114 @@ class MLDetector:
         
         Path(path).parent.mkdir(parents=True, exist_ok=True)
         
-        with open(path, 'wb') as f:
-            pickle.dump(self.model, f)
+        # Write then rename, so a running server never loads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                'model': self.model,
+                'attack_type_model': self.attack_type_model,
+                'feature_spec_version': FEATURE_SPEC_VERSION,
+                'feature_spec_hash': self.feature_spec_hash or FEATURE_SPEC_HASH,
+            }, f)
+        Path(tmp_path).replace(path)
         
         print(f"Model saved to {path}")
     
+    def save_compiled_model(self, path: str):
+        """Compile trained forest (and attack-type head) into one memory-mappable artifact"""
+        if self.model is None:
+            raise ValueError("No model to save")
+        
+        heads = {'detector': self._compile(self.model).to_arrays()}
+        if self.attack_type_model is not None:
+            heads['attack_type'] = self._compile(self.attack_type_model).to_arrays()
+        
+        size = model_artifact.write_artifact(path, heads, {
+            'feature_spec_version': FEATURE_SPEC_VERSION,
+            'feature_spec_hash': self.feature_spec_hash or FEATURE_SPEC_HASH,
+        })
+        
+        print(f"Compiled model saved to {path} ({size / 1024:.0f} KiB)")
+    
+    @staticmethod
+    def _compile(model) -> CompiledForest:
+        return model if isinstance(model, CompiledForest) else CompiledForest.from_sklearn(model)
+    
+    @staticmethod
+    def attack_type_path(path: str) -> Path:
+        """Attack-type head stored next to a legacy compiled .npz model"""
+        path = Path(path)
+        return path.with_name(f"{path.stem}.attack_type{path.suffix}")
+    
     def load_model(self, path: str):
-        """Load trained model from disk"""
-        with open(path, 'rb') as f:
-            self.model = pickle.load(f)
+        """Load trained model (compiled artifact, legacy .npz or pickle) from disk"""
+        model, spec_hash, attack_type_model = self.read_artifact(path)
+        self.use_model(model, spec_hash, attack_type_model)
         
         print(f"Model loaded from {path}")
+    
+    @classmethod
+    def read_artifact(cls, path: str) -> Tuple[object, Optional[str], Optional[object]]:
+        """
+        Read and validate a model file without touching the active model
+        Returns: (model, feature_spec_hash, attack_type_model or None)
+        """
+        attack_type_model = None
+        suffix = Path(path).suffix
+        if suffix == ARTIFACT_SUFFIX:
+            # Memory-mapped: nothing is deserialized and the pages are shared
+            heads, metadata = model_artifact.read_artifact(path)
+            model = CompiledForest.from_arrays(heads['detector'], metadata)
+            if 'attack_type' in heads:
+                attack_type_model = CompiledForest.from_arrays(heads['attack_type'], metadata)
+            spec_hash = metadata.get('feature_spec_hash')
+        elif suffix == '.npz':
+            model = CompiledForest.load(path)
+            spec_hash = model.metadata.get('feature_spec_hash')
+            head_path = cls.attack_type_path(path)
+            if head_path.exists():
+                attack_type_model = CompiledForest.load(str(head_path))
+                cls._check_feature_spec(attack_type_model.metadata.get('feature_spec_hash'), str(head_path))
+        else:
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+            
+            # Models saved before the feature spec existed are bare estimators
+            if isinstance(artifact, dict):
+                model = artifact['model']
+                spec_hash = artifact.get('feature_spec_hash')
+                attack_type_model = artifact.get('attack_type_model')
+            else:
+                model = artifact
+                spec_hash = None
+        
+        cls._check_feature_spec(spec_hash, path)
+        return model, spec_hash, attack_type_model
+    
+    def use_model(self, model, spec_hash: Optional[str], attack_type_model=None):
+        """Make model the active one (a single reference swap) and notify listeners"""
+        self.active = ActiveModel(model, attack_type_model, spec_hash)
+        
+        # Verdicts computed by the previous model are no longer valid
+        for listener in self._reload_listeners:
+            listener()
+    
+    def add_reload_listener(self, listener: Callable[[], None]):
+        """Register a callback invoked whenever the active model changes"""
+        self._reload_listeners.append(listener)
+    
+    @staticmethod
+    def _check_feature_spec(spec_hash: Optional[str], path: str):
+        """Refuse models trained on a different feature spec"""
+        if spec_hash is None:
+            print(f"⚠ Warning: {path} has no feature spec hash; "
+                  f"assuming feature spec v{FEATURE_SPEC_VERSION}")
+            return
+        
+        if spec_hash != FEATURE_SPEC_HASH:
+            raise ValueError(
+                f"Model {path} was trained with feature spec {spec_hash[:12]}, "
+                f"but this server extracts feature spec {FEATURE_SPEC_HASH[:12]} "
+                f"(v{FEATURE_SPEC_VERSION}). Retrain with 'python train_model.py'."
+            )
 
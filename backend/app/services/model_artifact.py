@@ -0,0 +1,93 @@
+"""
+Model Artifact Format
+Compiled forests stored as raw NumPy buffers behind a JSON header. Loading
+memory-maps the buffers read-only instead of unpickling, so startup does no
+per-node work and every process mapping the file shares the same pages.
+
+Layout: MAGIC | format version (u32) | header length (u32) | JSON header |
+padding | arrays, each starting on an ALIGNMENT boundary
+"""
+import json
+import struct
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+MAGIC = b'SQLIFRST'
+ARTIFACT_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def write_artifact(path: str, heads: Dict[str, Dict[str, np.ndarray]], metadata: Dict) -> int:
+    """
+    Write named groups of arrays ('heads') and JSON metadata to path
+    Written to a temporary file and renamed, so readers never see a partial
+    file (and processes mapping the old one keep it). Returns the file size.
+    """
+    # Little-endian, C-contiguous: the bytes on disk are the array as mapped
+    heads = {
+        name: {key: np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder('<'))
+               for key, array in arrays.items()}
+        for name, arrays in heads.items()
+    }
+
+    # Offsets are relative to the data section, which starts after the header
+    layout = {}
+    offset = 0
+    for name, arrays in heads.items():
+        layout[name] = {}
+        for key, array in arrays.items():
+            offset = _aligned(offset)
+            layout[name][key] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += array.nbytes
+
+    header = json.dumps({'metadata': metadata, 'heads': layout}).encode('utf-8')
+    data_start = _aligned(_PREAMBLE.size + len(header))
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, ARTIFACT_FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, arrays in heads.items():
+            for key, array in arrays.items():
+                f.seek(data_start + layout[name][key]['offset'])
+                f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        size = f.tell()
+    Path(tmp_path).replace(path)
+    return size
+
+def read_artifact(path: str) -> Tuple[Dict[str, Dict[str, np.ndarray]], Dict]:
+    """Map every array of an artifact read-only; returns (heads, metadata)"""
+    with open(path, 'rb') as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a model artifact")
+        if version != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported model artifact format {version} (expected {ARTIFACT_FORMAT_VERSION})"
+            )
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    data_start = _aligned(_PREAMBLE.size + header_length)
+    heads = {}
+    for name, layout in header['heads'].items():
+        heads[name] = {}
+        for key, spec in layout.items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            if int(np.prod(shape)) == 0:
+                # mmap cannot map zero bytes
+                heads[name][key] = np.empty(shape, dtype=dtype)
+                continue
+            mapped = np.memmap(
+                path, dtype=dtype, mode='r', offset=data_start + spec['offset'], shape=shape
+            )
+            # Plain ndarray view of the mapping, so results are not memmaps too
+            heads[name][key] = mapped.view(np.ndarray)
+    return heads, header['metadata']
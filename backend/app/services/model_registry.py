@@ -0,0 +1,269 @@
+"""
+Model Registry
+Hot reload of the detection model: a candidate is loaded and warmed in the
+background, then swapped in with a single reference assignment, so requests
+in flight finish on the old model and none are dropped. Previous versions
+are kept for rollback; in process mode each one is also copied to a file of
+its own, which is what the detection workers load.
+"""
+import asyncio
+import hashlib
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .feature_extractor import FeatureExtractor
+from .ml_detector import MLDetector
+from .executor import DetectionExecutor
+
+# Run through every candidate before it goes live
+WARMUP_QUERIES = [
+    "SELECT * FROM users WHERE id = 1",
+    "SELECT name, email FROM customers WHERE active = true ORDER BY name",
+    "INSERT INTO logs (message) VALUES ('login ok')",
+    "' OR '1'='1",
+    "' UNION SELECT username, password FROM users--",
+    "1; DROP TABLE users",
+    "' AND SLEEP(5)--",
+    "admin'--",
+]
+
+def artifact_version(path: str) -> str:
+    """Content hash of a model file, used as its version id"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+class ModelRegistry:
+    def __init__(
+        self,
+        ml_detector: MLDetector,
+        feature_extractor: FeatureExtractor,
+        executor: Optional[DetectionExecutor] = None,
+        model_path: Optional[str] = None,
+        model_dir: str = 'app/models',
+        history_size: int = 3,
+        watch_interval: float = 0.0
+    ):
+        self.ml_detector = ml_detector
+        self.executor = executor
+        self.model_path = model_path
+        self.model_dir = Path(model_dir).resolve()
+        self.history_size = history_size
+        self.watch_interval = watch_interval
+        self._warmup_features = feature_extractor.extract_matrix(WARMUP_QUERIES)
+        self._lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+        # Active entry first; each entry holds the model object for rollback
+        self._versions: List[Dict] = []
+        if ml_detector.model is not None and model_path and Path(model_path).exists():
+            self._versions.append(self._entry(
+                ml_detector.model, ml_detector.feature_spec_hash, ml_detector.attack_type_model,
+                model_path, warmup_ms=None,
+                artifact_path=self._snapshot(Path(model_path)) if self._needs_snapshots else None
+            ))
+            if self._needs_snapshots:
+                executor.reload_workers(self.active['artifact_path'])
+
+        self.reloads = 0
+        self.rollbacks = 0
+        self.failures = 0
+
+    @staticmethod
+    def _entry(
+        model, spec_hash: Optional[str], attack_type_model, path: str, warmup_ms: Optional[float],
+        artifact_path: Optional[str] = None
+    ) -> Dict:
+        artifact_path = str(artifact_path or path)
+        return {
+            'model': model,
+            'attack_type_model': attack_type_model,
+            'spec_hash': spec_hash,
+            'version': artifact_version(artifact_path),
+            'path': str(path),
+            # The file workers load; a per-version copy in process mode
+            'artifact_path': artifact_path,
+            'mtime': Path(path).stat().st_mtime,
+            'loaded_at': time.time(),
+            'warmup_ms': warmup_ms,
+        }
+
+    @property
+    def active(self) -> Optional[Dict]:
+        return self._versions[0] if self._versions else None
+
+    def _resolve(self, path: Optional[str]) -> Path:
+        """Model files may only come from model_dir (pickles execute code on load)"""
+        resolved = Path(path or self.model_path or '').resolve()
+        if self.model_dir not in resolved.parents:
+            raise ValueError(f"Model path must be inside {self.model_dir}")
+        if not resolved.is_file():
+            raise ValueError(f"Model file {path} does not exist")
+        return resolved
+
+    @property
+    def _needs_snapshots(self) -> bool:
+        """Process workers load models by path, which a later reload overwrites"""
+        return self.executor is not None and self.executor.mode == 'process'
+
+    def _snapshot(self, path: Path) -> Path:
+        """Copy a model file (and a legacy attack-type head) to versions/, named by content hash"""
+        versions_dir = self.model_dir / 'versions'
+        versions_dir.mkdir(exist_ok=True)
+        tmp_path = versions_dir / f"{path.name}.tmp"
+        shutil.copyfile(path, tmp_path)
+        snapshot = versions_dir / f"{path.stem}.{artifact_version(str(tmp_path))}{path.suffix}"
+        head_path = MLDetector.attack_type_path(str(path))
+        if path.suffix == '.npz' and head_path.exists():
+            shutil.copyfile(head_path, MLDetector.attack_type_path(str(snapshot)))
+        tmp_path.replace(snapshot)
+        return snapshot
+
+    def _prune_snapshots(self, dropped: List[Dict]):
+        """Delete the copies of versions that left the history"""
+        kept = {entry['artifact_path'] for entry in self._versions}
+        for entry in dropped:
+            if entry['artifact_path'] == entry['path'] or entry['artifact_path'] in kept:
+                continue
+            snapshot = Path(entry['artifact_path'])
+            snapshot.unlink(missing_ok=True)
+            MLDetector.attack_type_path(str(snapshot)).unlink(missing_ok=True)
+
+    def _prepare(self, path: Path, expected_version: Optional[str] = None) -> Dict:
+        """Load, validate and warm a candidate (runs on a worker thread)"""
+        # Load the copy itself, so workers get exactly the model that was warmed
+        artifact_path = self._snapshot(path) if self._needs_snapshots else path
+        try:
+            if expected_version is not None and artifact_version(str(artifact_path)) != expected_version:
+                raise ValueError(f"Model {path} is no longer version {expected_version}")
+            model, spec_hash, attack_type_model = MLDetector.read_artifact(str(artifact_path))
+
+            # A scratch detector runs the real prediction path on the candidate
+            candidate = MLDetector(decision_threshold=self.ml_detector.decision_threshold)
+            candidate.use_model(model, spec_hash, attack_type_model)
+            start = time.perf_counter()
+            _, confidence = candidate.predict_many(self._warmup_features)
+            attack_types = candidate.identify_attack_types(WARMUP_QUERIES, self._warmup_features)
+            warmup_ms = (time.perf_counter() - start) * 1000
+            if confidence.shape != (len(WARMUP_QUERIES),) or not np.all((confidence >= 0) & (confidence <= 1)):
+                raise ValueError(f"Model {path} produced invalid predictions during warmup")
+            if len(attack_types) != len(WARMUP_QUERIES):
+                raise ValueError(f"Model {path} produced invalid attack types during warmup")
+        except Exception:
+            if artifact_path != path:
+                self._prune_snapshots([{'path': str(path), 'artifact_path': str(artifact_path)}])
+            raise
+
+        return self._entry(model, spec_hash, attack_type_model, str(path), warmup_ms, artifact_path)
+
+    def _activate(self, entry: Dict):
+        self.ml_detector.use_model(entry['model'], entry['spec_hash'], entry['attack_type_model'])
+        if self.executor is not None:
+            self.executor.reload_workers(entry['artifact_path'])
+
+    async def reload(self, path: Optional[str] = None, expected_version: Optional[str] = None) -> Dict:
+        """
+        Load path (default: the current model file), warm it and swap it in
+        expected_version: refuse the file unless it still has this content hash
+        """
+        async with self._lock:
+            try:
+                resolved = self._resolve(path)
+                entry = await asyncio.to_thread(self._prepare, resolved, expected_version)
+                if expected_version is not None and entry['version'] != expected_version:
+                    # Replaced between the check and the read
+                    self._prune_snapshots([entry])
+                    raise ValueError(f"Model {resolved} is no longer version {expected_version}")
+            except Exception:
+                self.failures += 1
+                raise
+
+            self._activate(entry)
+            self._versions.insert(0, entry)
+            dropped = self._versions[self.history_size + 1:]
+            del self._versions[self.history_size + 1:]
+            self._prune_snapshots(dropped)
+            self.reloads += 1
+
+            print(f"✓ Model {entry['version']} activated from {entry['path']} "
+                  f"(warmup {entry['warmup_ms']:.1f} ms)")
+            return self.get_status()
+
+    async def rollback(self, expected_version: Optional[str] = None) -> Dict:
+        """Reactivate the previous model version (only if it is expected_version, when given)"""
+        async with self._lock:
+            if len(self._versions) < 2:
+                raise ValueError("No previous model version to roll back to")
+
+            previous = self._versions[1]
+            if expected_version is not None and previous['version'] != expected_version:
+                raise ValueError(
+                    f"Previous model version is {previous['version']}, not {expected_version}"
+                )
+            self._activate(previous)
+            # Swap places, so a second rollback returns to the newer model
+            self._versions[0], self._versions[1] = previous, self._versions[0]
+            self.rollbacks += 1
+
+            print(f"✓ Rolled back to model {previous['version']}")
+            return self.get_status()
+
+    async def start(self):
+        """Start watching the model file for changes (no-op when watch_interval is 0)"""
+        if self.watch_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = asyncio.create_task(self._watch_loop())
+
+    async def close(self):
+        """Stop the file watcher"""
+        if self._watcher is None:
+            return
+
+        self._watcher.cancel()
+        try:
+            await self._watcher
+        except asyncio.CancelledError:
+            pass
+        self._watcher = None
+
+    async def _watch_loop(self):
+        """Reload model_path whenever its mtime changes (a rollback sticks until then)"""
+        path = Path(self.model_path or '')
+        last_mtime = path.stat().st_mtime if path.is_file() else None
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            if not path.is_file():
+                continue
+            mtime = path.stat().st_mtime
+            if mtime == last_mtime:
+                continue
+            # Set before reloading, so a rejected file is not retried until it changes
+            last_mtime = mtime
+            try:
+                await self.reload(str(path))
+            except Exception as e:
+                print(f"⚠ Model reload failed: {e}")
+
+    @staticmethod
+    def _describe(entry: Dict) -> Dict:
+        description = {
+            key: value for key, value in entry.items() if key not in ('model', 'attack_type_model')
+        }
+        description['attack_type_head'] = entry['attack_type_model'] is not None
+        return description
+
+    def get_status(self) -> Dict:
+        """Get the active version, history and reload counters"""
+        return {
+            'active': self._describe(self.active) if self.active else None,
+            'history': [self._describe(entry) for entry in self._versions[1:]],
+            'reloads': self.reloads,
+            'rollbacks': self.rollbacks,
+            'failures': self.failures,
+        }
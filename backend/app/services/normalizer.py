@@ -5,14 +5,23 @@ Standardizes SQL queries by removing obfuscation techniques
 import re
 from urllib.parse import unquote
 
+# Compiled once at import; normalize() runs on every request
+BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CONTROL_WHITESPACE_RE = re.compile(r'[\t\n\r\f\v]+')
+
+# Literals masked by fingerprint(): quoted strings (with '' / \\ escapes),
+# hex literals and numbers not glued to an identifier
+LITERAL_RE = re.compile(r"""
+      '(?:[^'\\]|\\.|'')*'
+    | "(?:[^"\\]|\\.|"")*"
+    | \b0x[0-9a-f]+\b
+    | (?<![\w.])\d+(?:\.\d+)?(?:e[+-]?\d+)?\b
+""", re.VERBOSE)
+VALUE_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+MAX_DECODE_PASSES = 3  # Handle triple encoding
+
 class QueryNormalizer:
-    def __init__(self):
-        self.comment_patterns = [
-            (r'--.*$', ''),  # Single line comments
-            (r'/\*.*?\*/', ''),  # Multi-line comments
-            (r'#.*$', ''),  # MySQL comments
-        ]
-    
     def normalize(self, query: str) -> str:
         """
         Normalize SQL query by:
@@ -21,36 +30,48 @@ class QueryNormalizer:
         3. Normalizing whitespace
         4. Converting to lowercase
         """
-        # URL decode (handle multiple encoding)
+        # URL decode (handle multiple encoding); nothing to do without '%'
         normalized = query
-        for _ in range(3):  # Handle triple encoding
-            decoded = unquote(normalized)
-            if decoded == normalized:
-                break
-            normalized = decoded
-        
-        # Remove comments
-        for pattern, replacement in self.comment_patterns:
-            normalized = re.sub(pattern, replacement, normalized, flags=re.MULTILINE | re.DOTALL)
-        
-        # Normalize whitespace
-        normalized = re.sub(r'\s+', ' ', normalized)
-        
-        # Strip leading/trailing whitespace
-        normalized = normalized.strip()
-        
-        # Convert to lowercase for consistency
-        normalized = normalized.lower()
-        
-        return normalized
-    
+        if '%' in normalized:
+            for _ in range(MAX_DECODE_PASSES):
+                decoded = unquote(normalized)
+                if decoded == normalized:
+                    break
+                normalized = decoded
+
+        # Remove comments: '--' and '#' run to the end of the query,
+        # so they are plain truncations rather than regex passes
+        dashes = normalized.find('--')
+        if dashes != -1:
+            normalized = normalized[:dashes]
+
+        if '/*' in normalized:
+            normalized = BLOCK_COMMENT_RE.sub('', normalized)
+
+        hash_mark = normalized.find('#')
+        if hash_mark != -1:
+            normalized = normalized[:hash_mark]
+
+        # Lowercase, then str.split() collapses and strips whitespace in one C pass
+        return ' '.join(normalized.lower().split())
+
+    def fingerprint(self, normalized: str) -> str:
+        """
+        Mask literals in a normalized query so queries that differ only in
+        their values share one fingerprint, e.g.
+        "select * from users where id = 42" -> "select * from users where id = ?"
+        """
+        masked = LITERAL_RE.sub('?', normalized)
+        if '(' in masked:
+            masked = VALUE_LIST_RE.sub('(?+)', masked)
+        return masked
+
     def remove_obfuscation(self, query: str) -> str:
         """Remove common obfuscation techniques"""
         # Remove null bytes
         query = query.replace('\x00', '')
-        
+
         # Remove excessive whitespace variations
-        query = re.sub(r'[\t\n\r\f\v]+', ' ', query)
-        
-        return query
+        query = CONTROL_WHITESPACE_RE.sub(' ', query)
 
+        return query
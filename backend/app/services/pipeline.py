@@ -0,0 +1,141 @@
+"""
+Detection Pipeline
+CPU-bound detection steps (normalize -> cache -> features -> model -> type),
+kept free of I/O so they can run on a worker thread or process
+"""
+from typing import Dict, List, Optional
+
+from .normalizer import QueryNormalizer
+from .feature_extractor import FeatureExtractor
+from .ml_detector import MLDetector
+from .verdict_cache import VerdictCache
+
+class DetectionPipeline:
+    def __init__(
+        self,
+        normalizer: QueryNormalizer,
+        feature_extractor: FeatureExtractor,
+        ml_detector: MLDetector,
+        verdict_cache: VerdictCache
+    ):
+        self.normalizer = normalizer
+        self.feature_extractor = feature_extractor
+        self.ml_detector = ml_detector
+        self.verdict_cache = verdict_cache
+
+    def analyze(self, query: str) -> Dict:
+        """Run detection for one query"""
+        # Step 1: Normalize query and mask its literals
+        normalized = self.normalizer.normalize(query)
+        fingerprint = self.normalizer.fingerprint(normalized)
+
+        # Repeated queries skip feature extraction and inference
+        generation = self.verdict_cache.generation
+        cached = self.verdict_cache.get(normalized)
+        hit = cached is not None
+        if hit:
+            is_malicious, confidence, attack_type = cached
+        else:
+            # Step 2: Extract features
+            features_array = self.feature_extractor.extract_row(normalized)
+
+            # Step 3: ML Detection (both heads from one model version)
+            active = self.ml_detector.active
+            is_malicious, confidence = self.ml_detector.predict(features_array, active)
+
+            # Step 4: Identify attack type if malicious
+            attack_type = None
+            if is_malicious:
+                attack_type = self.ml_detector.identify_attack_type(normalized, features_array, active)
+
+            # Not stored if a model reload invalidated the cache meanwhile
+            self.verdict_cache.put(normalized, (is_malicious, confidence, attack_type), generation)
+
+        return {
+            'normalized_query': normalized,
+            'fingerprint': fingerprint,
+            'is_malicious': is_malicious,
+            'confidence': confidence,
+            'attack_type': attack_type,
+            'cached': hit,
+        }
+
+    def analyze_many(self, queries: List[str]) -> List[Dict]:
+        """Run detection for a batch of queries with one model call"""
+        # Step 1: Normalize queries and mask their literals
+        normalized = [self.normalizer.normalize(query) for query in queries]
+        fingerprints = [self.normalizer.fingerprint(query) for query in normalized]
+
+        # Repeated queries skip feature extraction and inference
+        generation = self.verdict_cache.generation
+        verdicts = [self.verdict_cache.get(query) for query in normalized]
+        hits = [verdict is not None for verdict in verdicts]
+        misses = [index for index, hit in enumerate(hits) if not hit]
+
+        if misses:
+            # Step 2: Build one feature matrix for the uncached queries
+            features_matrix = self.feature_extractor.extract_matrix(
+                normalized[index] for index in misses
+            )
+
+            # Step 3: ML Detection (single forest call; both heads from one model version)
+            active = self.ml_detector.active
+            is_malicious, confidence = self.ml_detector.predict_many(features_matrix, active=active)
+
+            # Step 4: Identify attack types for malicious queries (single head call)
+            attack_types = iter(self.ml_detector.identify_attack_types(
+                [normalized[index] for index, malicious in zip(misses, is_malicious) if malicious],
+                features_matrix[is_malicious],
+                active
+            ))
+            for index, malicious, score in zip(misses, is_malicious, confidence):
+                malicious = bool(malicious)
+                query = normalized[index]
+                attack_type = next(attack_types) if malicious else None
+                verdicts[index] = (malicious, float(score), attack_type)
+                self.verdict_cache.put(query, verdicts[index], generation)
+
+        return [
+            {
+                'normalized_query': query,
+                'fingerprint': fingerprint,
+                'is_malicious': malicious,
+                'confidence': score,
+                'attack_type': attack_type,
+                'cached': hit,
+            }
+            for query, fingerprint, (malicious, score, attack_type), hit
+            in zip(normalized, fingerprints, verdicts, hits)
+        ]
+
+# Per-process pipeline used by the process-pool execution mode
+_worker_pipeline: Optional[DetectionPipeline] = None
+# Parent cache generation this worker's cache last matched
+_worker_cache_generation: Optional[int] = None
+
+def init_worker(model_path: str, cache_size: int, cache_ttl_seconds: float):
+    """ProcessPoolExecutor initializer: build this worker's own pipeline"""
+    global _worker_pipeline
+    _worker_pipeline = DetectionPipeline(
+        normalizer=QueryNormalizer(),
+        feature_extractor=FeatureExtractor(),
+        ml_detector=MLDetector(model_path=model_path),
+        verdict_cache=VerdictCache(max_size=cache_size, ttl_seconds=cache_ttl_seconds)
+    )
+
+def _sync_cache(cache_generation: int):
+    """Drop this worker's verdicts once the parent cache was invalidated"""
+    global _worker_cache_generation
+    if cache_generation != _worker_cache_generation:
+        _worker_pipeline.verdict_cache.invalidate()
+        _worker_cache_generation = cache_generation
+
+def worker_analyze(query: str, cache_generation: int) -> Dict:
+    """Process-pool entry point for DetectionPipeline.analyze"""
+    _sync_cache(cache_generation)
+    return _worker_pipeline.analyze(query)
+
+def worker_analyze_many(queries: List[str], cache_generation: int) -> List[Dict]:
+    """Process-pool entry point for DetectionPipeline.analyze_many"""
+    _sync_cache(cache_generation)
+    return _worker_pipeline.analyze_many(queries)
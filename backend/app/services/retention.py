@@ -0,0 +1,160 @@
+"""
+Retention Service
+Retires day partitions of the attacks table once they pass the retention
+age: each day is exported to a columnar archive (or just dropped) and its
+rows are deleted, keeping the hot table and its indexes small
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..database.archive import ARCHIVE_CHUNK_ROWS, ArchiveWriter
+from ..database.schema import Database
+
+# What happens to partitions past the retention age:
+#   'archive' - export to the directory <archive_dir>/attacks-<day>-<first id>, then delete
+#   'drop'    - delete without keeping the rows
+RETENTION_MODES = ('archive', 'drop')
+
+DAY_US = 86400 * 1_000_000
+
+class RetentionManager:
+    def __init__(
+        self,
+        db: Database,
+        retention_days: int = 0,
+        mode: str = 'archive',
+        archive_dir: str = 'data/archive',
+        interval_seconds: float = 3600.0
+    ):
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Unknown retention mode '{mode}', expected one of {RETENTION_MODES}")
+
+        self.db = db
+        self.retention_days = retention_days
+        self.mode = mode
+        self.archive_dir = archive_dir
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        self.runs = 0
+        self.partitions_retired = 0
+        self.rows_retired = 0
+        self.last_run_at: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    async def start(self):
+        """Start the periodic retention task (no-op when retention is disabled)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._retention_loop())
+
+    async def close(self):
+        """Stop the periodic retention task"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _retention_loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"⚠ Retention run failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def cutoff_us(self) -> int:
+        """Start of the oldest UTC day that is kept"""
+        today_us = int(time.time()) // 86400 * DAY_US
+        return today_us - (self.retention_days - 1) * DAY_US
+
+    async def run_once(self) -> List[Dict]:
+        """Retire every whole day older than the retention age, oldest first"""
+        if not self.enabled:
+            return []
+
+        async with self._lock:
+            cutoff = self.cutoff_us()
+            retired = []
+
+            while True:
+                oldest = await self.db.get_oldest_timestamp()
+                if oldest is None or oldest >= cutoff:
+                    break
+
+                start_us = oldest // DAY_US * DAY_US
+                partition = await self._retire_day(start_us, start_us + DAY_US)
+                if partition is None:
+                    break
+                retired.append(partition)
+
+            self.runs += 1
+            self.last_run_at = time.time()
+            if retired:
+                print(f"✓ Retention retired {len(retired)} partitions "
+                      f"({sum(p['row_count'] for p in retired)} rows, mode={self.mode})")
+            return retired
+
+    async def _retire_day(self, start_us: int, end_us: int) -> Optional[Dict]:
+        day = datetime.fromtimestamp(start_us // 1_000_000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+        archive_path = archive_bytes = None
+        if self.mode == 'archive':
+            summary = await self.db.get_partition_summary(start_us, end_us)
+            if summary['row_count'] == 0:
+                return None
+            archive_path = str(Path(self.archive_dir) / f"attacks-{day}-{summary['first_id']}")
+            archive_bytes = await self._write_archive(archive_path, start_us, end_us, summary)
+
+        state = 'archived' if self.mode == 'archive' else 'dropped'
+        partition = await self.db.retire_partition(
+            day, start_us, end_us, state, archive_path, archive_bytes
+        )
+        if partition is not None:
+            self.partitions_retired += 1
+            self.rows_retired += partition['row_count']
+        return partition
+
+    async def _write_archive(self, path: str, start_us: int, end_us: int, summary: Dict) -> int:
+        """Page through the day into an archive, one chunk in memory at a time"""
+        writer = ArchiveWriter(path, summary['row_count'], summary['string_bytes'])
+        try:
+            chunk = []
+            async for record in self.db.iter_partition(start_us, end_us, batch_size=ARCHIVE_CHUNK_ROWS):
+                chunk.append(record)
+                if len(chunk) == ARCHIVE_CHUNK_ROWS:
+                    # Encoding is CPU-bound; keep it off the event loop
+                    await asyncio.to_thread(writer.append, chunk)
+                    chunk = []
+            if chunk:
+                await asyncio.to_thread(writer.append, chunk)
+            return await asyncio.to_thread(writer.close)
+        except BaseException:
+            writer.abort()
+            raise
+
+    async def get_stats(self) -> Dict:
+        """Get retention settings, counters and the partition catalog"""
+        return {
+            'retention_days': self.retention_days,
+            'mode': self.mode,
+            'archive_dir': self.archive_dir,
+            'interval_seconds': self.interval_seconds,
+            'runs': self.runs,
+            'partitions_retired': self.partitions_retired,
+            'rows_retired': self.rows_retired,
+            'last_run_at': self.last_run_at,
+            'partitions': await self.db.get_partitions(),
+        }
@@ -0,0 +1,102 @@
+"""
+Verdict Cache Service
+Bounded LRU cache of detection verdicts keyed by normalized query
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# (is_malicious, confidence, attack_type)
+Verdict = Tuple[bool, float, Optional[str]]
+
+class VerdictCache:
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[bytes, Tuple[float, Verdict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate(); verdicts computed before that are not stored
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(normalized_query: str) -> bytes:
+        """Fixed-size key so long payloads don't pin their text in memory"""
+        return hashlib.blake2b(normalized_query.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, normalized_query: str) -> Optional[Verdict]:
+        """Return the cached verdict, or None on a miss or expired entry"""
+        if self.max_size <= 0:
+            return None
+
+        key = self.key_for(normalized_query)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, verdict = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return verdict
+
+    def put(self, normalized_query: str, verdict: Verdict, generation: Optional[int] = None):
+        """
+        Cache a verdict, evicting the least recently used entries
+        generation: self.generation read before computing the verdict; if an
+        invalidate() happened since, the verdict may come from the old model
+        """
+        if self.max_size <= 0:
+            return
+
+        key = self.key_for(normalized_query)
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (expires_at, verdict)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every cached verdict (e.g. after a model reload)"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups * 100) if lookups > 0 else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
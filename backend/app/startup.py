@@ -0,0 +1,60 @@
+"""
+Startup Timing
+Durations of the startup phases (imports, model load, database init),
+recorded on every start and printed when STARTUP_TIMING=1
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# (name, depth, seconds) in the order the phases started
+_phases: List[List] = []
+_depth = 0
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block; phases started inside it are reported nested under it"""
+    global _depth
+    entry = [name, _depth, 0.0]
+    _phases.append(entry)
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry[2] = time.perf_counter() - start
+        _depth -= 1
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux only, else None)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesized command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+
+def get_report() -> Dict:
+    """Recorded phases in milliseconds, plus the process age"""
+    age = process_age()
+    return {
+        'phases': [
+            {'name': name, 'depth': depth, 'ms': seconds * 1000}
+            for name, depth, seconds in _phases
+        ],
+        'process_age_ms': age * 1000 if age is not None else None,
+    }
+
+def print_report():
+    report = get_report()
+    print("Startup timing:")
+    for entry in report['phases']:
+        indent = '  ' * (entry['depth'] + 1)
+        print(f"{indent}{entry['name']:<{24 - len(indent)}} {entry['ms']:>9.1f} ms")
+    if report['process_age_ms'] is not None:
+        # Includes interpreter start and everything not wrapped in a phase
+        print(f"  {'since process start':<22} {report['process_age_ms']:>9.1f} ms")
@@ -2,13 +2,25 @@
 Synthetic SQL Injection Dataset Generator
 Generates labeled attack and benign query samples for ML training
 """
+import json
+import os
 import random
+import time
 import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.services.feature_extractor import FeatureExtractor
+from app.services.feature_spec import FEATURE_NAMES, FEATURE_SPEC_VERSION, FEATURE_SPEC_HASH
+
+# Samples per shard written by write_dataset; each shard is seeded on its own
+DEFAULT_SHARD_SIZE = 100_000
 
 class SQLInjectionDataGenerator:
     def __init__(self):
+        self.feature_extractor = FeatureExtractor()
         self.attack_templates = {
             'union_based': [
                 "' UNION SELECT username, password FROM users--",
@@ -80,45 +92,17 @@ class SQLInjectionDataGenerator:
         ]
     
     def extract_features(self, query):
-        """Extract features from SQL query"""
-        query_lower = query.lower()
-        
-        features = {
-            'length': len(query),
-            'union_count': query_lower.count('union'),
-            'select_count': query_lower.count('select'),
-            'insert_count': query_lower.count('insert'),
-            'update_count': query_lower.count('update'),
-            'delete_count': query_lower.count('delete'),
-            'drop_count': query_lower.count('drop'),
-            'exec_count': query_lower.count('exec'),
-            'execute_count': query_lower.count('execute'),
-            'concat_count': query_lower.count('concat'),
-            'cast_count': query_lower.count('cast'),
-            'char_count': query_lower.count('char'),
-            'comment_dashes': query.count('--'),
-            'comment_slash_star': query.count('/*'),
-            'single_quote': query.count("'"),
-            'double_quote': query.count('"'),
-            'semicolon': query.count(';'),
-            'equals': query.count('='),
-            'or_keyword': query_lower.count(' or '),
-            'and_keyword': query_lower.count(' and '),
-            'sleep_count': query_lower.count('sleep'),
-            'benchmark_count': query_lower.count('benchmark'),
-            'waitfor_count': query_lower.count('waitfor'),
-            'information_schema': 1 if 'information_schema' in query_lower else 0,
-            'version_func': 1 if 'version()' in query_lower or '@@version' in query_lower else 0,
-            'database_func': 1 if 'database()' in query_lower else 0,
-            'user_func': 1 if 'user()' in query_lower else 0,
-            'has_hex': 1 if '0x' in query_lower else 0,
-        }
-        
-        return features
+        """Extract features from SQL query (shared with the serving extractor)"""
+        return self.feature_extractor.extract(query)
     
-    def generate_dataset(self, num_samples=1000):
-        """Generate balanced dataset of attacks and benign queries"""
-        data = []
+    @property
+    def attack_types(self) -> List[str]:
+        """Label names; write_dataset stores their index in attack_types.npy"""
+        return list(self.attack_templates) + ['benign']
+    
+    def sample_queries(self, num_samples, rng=random) -> List[Tuple[str, int, str]]:
+        """Draw (query, label, attack_type) samples: 60% attacks, 40% benign, shuffled"""
+        samples = []
         
         # Generate attack samples (60% of dataset)
         num_attacks = int(num_samples * 0.6)
@@ -127,41 +111,146 @@ class SQLInjectionDataGenerator:
         for attack_type, templates in self.attack_templates.items():
             for _ in range(attacks_per_type):
                 # Select random template and add variations
-                template = random.choice(templates)
+                template = rng.choice(templates)
                 
                 # Add random variations
-                if random.random() > 0.5:
-                    template = template.upper() if random.random() > 0.5 else template
-                
-                features = self.extract_features(template)
-                features['query'] = template
-                features['label'] = 1  # Malicious
-                features['attack_type'] = attack_type
+                if rng.random() > 0.5:
+                    template = template.upper() if rng.random() > 0.5 else template
                 
-                data.append(features)
+                samples.append((template, 1, attack_type))  # Malicious
         
         # Generate benign samples (40% of dataset)
-        num_benign = num_samples - len(data)
+        num_benign = num_samples - len(samples)
         
         for _ in range(num_benign):
-            query = random.choice(self.benign_queries)
+            query = rng.choice(self.benign_queries)
             
             # Add variations to benign queries
-            if random.random() > 0.7:
-                query = query.replace('1', str(random.randint(1, 100)))
+            if rng.random() > 0.7:
+                query = query.replace('1', str(rng.randint(1, 100)))
             
+            samples.append((query, 0, 'benign'))  # Benign
+        
+        # Shuffle dataset
+        rng.shuffle(samples)
+        
+        return samples
+    
+    def generate_dataset(self, num_samples=1000):
+        """Generate balanced dataset of attacks and benign queries"""
+        data = []
+        for query, label, attack_type in self.sample_queries(num_samples):
             features = self.extract_features(query)
             features['query'] = query
-            features['label'] = 0  # Benign
-            features['attack_type'] = 'benign'
-            
+            features['label'] = label
+            features['attack_type'] = attack_type
             data.append(features)
         
-        # Shuffle dataset
-        random.shuffle(data)
-        
         return pd.DataFrame(data)
     
+    def generate_shard(self, num_samples, seed) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Generate one shard as arrays: features (n, n_features) float32,
+        labels int8 and attack type indices uint8
+        """
+        samples = self.sample_queries(num_samples, random.Random(seed))
+        
+        # Templates repeat heavily: extract each distinct query once, then gather
+        row_of_query = {}
+        rows = np.empty(len(samples), dtype=np.int64)
+        for index, (query, _, _) in enumerate(samples):
+            rows[index] = row_of_query.setdefault(query, len(row_of_query))
+        features = self.feature_extractor.extract_matrix(row_of_query)[rows]
+        
+        type_index = {attack_type: code for code, attack_type in enumerate(self.attack_types)}
+        labels = np.fromiter((label for _, label, _ in samples), dtype=np.int8, count=len(samples))
+        attack_types = np.fromiter(
+            (type_index[attack_type] for _, _, attack_type in samples), dtype=np.uint8, count=len(samples)
+        )
+        return features, labels, attack_types
+    
+    def write_dataset(
+        self,
+        num_samples,
+        output_dir='data',
+        shard_size=DEFAULT_SHARD_SIZE,
+        workers: Optional[int] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Generate a dataset of any size straight into memory-mapped .npy files
+        Shards run on a process pool and each worker writes its own rows, so
+        memory stays at a few shards whatever num_samples is. Shard i is
+        seeded from (seed, i): the output does not depend on the worker count.
+        Without a seed a fresh one is drawn (and recorded in dataset.json).
+        """
+        if num_samples <= 0 or shard_size <= 0:
+            raise ValueError("num_samples and shard_size must be positive")
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy)
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        n_features = len(FEATURE_NAMES)
+        
+        # Preallocate the full arrays; workers fill their slices in place
+        for name, dtype, shape in (
+            ('features.npy', np.float32, (num_samples, n_features)),
+            ('labels.npy', np.int8, (num_samples,)),
+            ('attack_types.npy', np.uint8, (num_samples,)),
+        ):
+            np.lib.format.open_memmap(output_path / name, mode='w+', dtype=dtype, shape=shape).flush()
+        
+        shards = [
+            (str(output_path), start, min(shard_size, num_samples - start), _shard_seed(seed, index))
+            for index, start in enumerate(range(0, num_samples, shard_size))
+        ]
+        workers = workers or os.cpu_count() or 1
+        
+        start_time = time.perf_counter()
+        attack_count = 0
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards) or 1)) as pool:
+            for done, malicious in enumerate(pool.map(_write_shard, shards), 1):
+                attack_count += malicious
+                if done % max(1, len(shards) // 10) == 0 or done == len(shards):
+                    print(f"  {done}/{len(shards)} shards "
+                          f"({time.perf_counter() - start_time:.1f}s)")
+        
+        with open(output_path / 'dataset.json', 'w') as f:
+            json.dump({
+                'num_samples': num_samples,
+                'shard_size': shard_size,
+                'seed': seed,
+                'attack_types': self.attack_types,
+                'feature_spec_version': FEATURE_SPEC_VERSION,
+                'feature_spec_hash': FEATURE_SPEC_HASH,
+            }, f, indent=2)
+        self._write_feature_spec(output_path)
+        
+        print(f"Dataset saved to {output_path}")
+        print(f"Total samples: {num_samples}")
+        print(f"Attack samples: {attack_count}")
+        print(f"Benign samples: {num_samples - attack_count}")
+        print(f"Features: {n_features}")
+    
+    @staticmethod
+    def load_dataset(output_dir='data') -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """
+        Memory-map a dataset written by write_dataset
+        Returns: (features, labels, attack type codes, attack type names);
+        codes index into names and stay memory-mapped like the rest
+        """
+        output_path = Path(output_dir)
+        with open(output_path / 'dataset.json') as f:
+            manifest = json.load(f)
+        if manifest['feature_spec_hash'] != FEATURE_SPEC_HASH:
+            raise ValueError(f"Dataset in {output_dir} was generated with a different feature spec")
+        
+        X = np.load(output_path / 'features.npy', mmap_mode='r')
+        y = np.load(output_path / 'labels.npy', mmap_mode='r')
+        attack_type_codes = np.load(output_path / 'attack_types.npy', mmap_mode='r')
+        return X, y, attack_type_codes, manifest['attack_types']
+    
     def save_dataset(self, df, output_dir='data'):
         """Save dataset to files"""
         output_path = Path(output_dir)
@@ -170,13 +259,14 @@ class SQLInjectionDataGenerator:
         # Save full dataset as CSV
         df.to_csv(output_path / 'sqli_dataset.csv', index=False)
         
-        # Save features and labels separately for ML
-        feature_columns = [col for col in df.columns if col not in ['query', 'label', 'attack_type']]
+        # Save features and labels separately for ML, in feature spec order
+        feature_columns = list(FEATURE_NAMES)
         X = df[feature_columns].values
         y = df['label'].values
         
         np.save(output_path / 'features.npy', X)
         np.save(output_path / 'labels.npy', y)
+        self._write_feature_spec(output_path)
         
         print(f"Dataset saved to {output_path}")
         print(f"Total samples: {len(df)}")
@@ -185,6 +275,44 @@ class SQLInjectionDataGenerator:
         print(f"Features: {len(feature_columns)}")
         
         return X, y, feature_columns
+    
+    @staticmethod
+    def _write_feature_spec(output_path: Path):
+        with open(output_path / 'feature_spec.json', 'w') as f:
+            json.dump({
+                'version': FEATURE_SPEC_VERSION,
+                'hash': FEATURE_SPEC_HASH,
+                'feature_names': list(FEATURE_NAMES)
+            }, f, indent=2)
+
+def _shard_seed(seed, shard_index) -> int:
+    """Independent, reproducible seed for one shard"""
+    return int(np.random.SeedSequence([seed, shard_index]).generate_state(1)[0])
+
+# Per-process generator used by write_dataset's pool
+_worker_generator: Optional[SQLInjectionDataGenerator] = None
+
+def _write_shard(shard) -> int:
+    """Generate one shard into the dataset files; returns its attack count"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = SQLInjectionDataGenerator()
+    
+    output_dir, start, num_samples, seed = shard
+    features, labels, attack_types = _worker_generator.generate_shard(num_samples, seed)
+    
+    output_path = Path(output_dir)
+    end = start + num_samples
+    for name, values in (
+        ('features.npy', features),
+        ('labels.npy', labels),
+        ('attack_types.npy', attack_types),
+    ):
+        target = np.load(output_path / name, mmap_mode='r+')
+        target[start:end] = values
+        target.flush()
+        del target
+    return int(labels.sum())
 
 def main():
     """Generate and save dataset"""
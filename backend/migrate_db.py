@@ -0,0 +1,84 @@
+"""
+Knowledge Base Migration
+Upgrades an existing knowledge base file to the current schema
+(also done automatically on startup; this tool adds backup and VACUUM)
+"""
+import argparse
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database.schema import Database
+from app.database.migrations import SCHEMA_VERSION
+
+def schema_version(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def backup(db_path: str, backup_path: str):
+    """Consistent copy via the SQLite online backup API (safe with WAL)"""
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(backup_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def vacuum(db_path: str):
+    """Rewrite the file so space freed by the migration is returned"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+async def migrate(db_path: str):
+    database = Database(db_path, read_pool_size=1)
+    try:
+        await database.initialize()
+    finally:
+        await database.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade a knowledge base to the current schema")
+    parser.add_argument('--db', default='data/knowledge_base.db', help="Database file")
+    parser.add_argument('--backup', help="Write a copy of the database here first")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM after migrating")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"⚠ {args.db} does not exist")
+        sys.exit(1)
+
+    print("="*60)
+    print("KNOWLEDGE BASE MIGRATION")
+    print("="*60)
+
+    before_version = schema_version(args.db)
+    before_size = Path(args.db).stat().st_size
+    print(f"Database: {args.db} (schema v{before_version or 1}, {before_size / 1024:.1f} KB)")
+
+    if args.backup:
+        backup(args.db, args.backup)
+        print(f"✓ Backup written to {args.backup}")
+
+    asyncio.run(migrate(args.db))
+
+    if args.vacuum:
+        vacuum(args.db)
+        print("✓ Vacuumed")
+
+    after_size = Path(args.db).stat().st_size
+    print(f"✓ Schema v{schema_version(args.db)} (target v{SCHEMA_VERSION}), {after_size / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
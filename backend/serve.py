@@ -0,0 +1,238 @@
+"""
+Pre-fork Server
+Runs app.main:app on several worker processes that share one copy of the
+model: the master imports the app (loading the model) and binds the socket,
+then forks the workers, which inherit both copy-on-write. Per-worker memory
+is reported from /proc (periodically, or on SIGUSR1). Model reloads,
+rollbacks and cache clears are relayed to every worker (see
+app/services/control.py).
+
+Linux/macOS only (os.fork); use `uvicorn app.main:app` elsewhere.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import uvicorn
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.control import CONTROL_SIGNAL
+
+# Seconds a worker must stay up before its exit counts as a crash to respawn from
+RESPAWN_BACKOFF_SECONDS = 1.0
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket shared by every worker (the kernel spreads accepts)"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """Rss, Pss, Shared and Private KiB of a process (None once it has exited)"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except FileNotFoundError:
+        return None
+    except OSError:
+        # No smaps_rollup (old kernel / not Linux): only what status offers
+        return {'Rss': _vm_rss(pid), 'Pss': 0, 'Shared': 0, 'Private': 0}
+
+    return {
+        'Rss': fields.get('Rss', 0),
+        'Pss': fields.get('Pss', 0),
+        'Shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'Private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+def _vm_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+class PreforkServer:
+    def __init__(self, app, host: str, port: int, workers: int, log_level: str):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.socket: Optional[socket.socket] = None
+        self._pids: Dict[int, int] = {}  # pid -> worker index
+        self._started_at: Dict[int, float] = {}
+        self._stopping = False
+        self._report_requested = False
+        self._control_requested = False
+        self.control_log: Optional[str] = None
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: the default handlers let uvicorn install its own
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+            # Ignored (not fatal) until the worker's control channel takes it over
+            signal.signal(CONTROL_SIGNAL, signal.SIG_IGN)
+            code = 0
+            try:
+                self._serve(index)
+            except BaseException as e:
+                print(f"⚠ Worker {index} failed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+
+        self._pids[pid] = index
+        self._started_at[pid] = time.monotonic()
+
+    def _serve(self, index: int):
+        # Retention deletes rows; one worker runs it for all of them
+        self.app.state.background_maintenance = index == 0
+        self.app.state.control_log = self.control_log
+        config = uvicorn.Config(self.app, log_level=self.log_level, lifespan='on')
+        uvicorn.Server(config).run(sockets=[self.socket])
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _request_report(self, signum, frame):
+        self._report_requested = True
+
+    def _request_control(self, signum, frame):
+        self._control_requested = True
+
+    def _relay_control(self):
+        """A worker logged an admin action: have every worker apply it"""
+        for pid in self._pids:
+            try:
+                os.kill(pid, CONTROL_SIGNAL)
+            except ProcessLookupError:
+                pass
+
+    def report_memory(self):
+        """Print memory of the master and each worker"""
+        rows = [('master', os.getpid())] + [
+            (f"worker {index}", pid)
+            for pid, index in sorted(self._pids.items(), key=lambda item: item[1])
+        ]
+        print(f"{'process':<10} {'pid':>7} {'rss MiB':>9} {'pss MiB':>9} {'shared MiB':>11} {'private MiB':>12}")
+        total_pss = 0
+        for name, pid in rows:
+            memory = process_memory(pid)
+            if memory is None:
+                continue
+            total_pss += memory['Pss']
+            print(f"{name:<10} {pid:>7} {memory['Rss'] / 1024:>9.1f} {memory['Pss'] / 1024:>9.1f} "
+                  f"{memory['Shared'] / 1024:>11.1f} {memory['Private'] / 1024:>12.1f}")
+        print(f"Total PSS: {total_pss / 1024:.1f} MiB")
+
+    def run(self, memory_interval: float = 0.0):
+        """Fork the workers and supervise them until SIGINT/SIGTERM"""
+        self.socket = bind_socket(self.host, self.port)
+        fd, self.control_log = tempfile.mkstemp(prefix='sqli-control-', suffix='.jsonl')
+        os.close(fd)
+
+        # Objects created so far (the app, services and model) move to a
+        # permanent generation: collections in the workers no longer write
+        # to their headers, so those pages stay shared
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGUSR1, self._request_report)
+        signal.signal(CONTROL_SIGNAL, self._request_control)
+
+        for index in range(self.workers):
+            self._spawn(index)
+        print(f"✓ Serving on http://{self.host}:{self.port} with {self.workers} workers "
+              f"(master pid {os.getpid()})")
+
+        next_report = time.monotonic() + memory_interval if memory_interval > 0 else None
+        while not self._stopping:
+            self._reap()
+            if self._control_requested:
+                self._control_requested = False
+                self._relay_control()
+            if self._report_requested or (next_report is not None and time.monotonic() >= next_report):
+                self._report_requested = False
+                self.report_memory()
+                if next_report is not None:
+                    next_report = time.monotonic() + memory_interval
+            time.sleep(0.2)
+
+        self._shutdown()
+
+    def _reap(self):
+        """Respawn workers that exited on their own"""
+        while self._pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            index = self._pids.pop(pid, None)
+            started_at = self._started_at.pop(pid, time.monotonic())
+            if index is None or self._stopping:
+                continue
+
+            print(f"⚠ Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+            # A worker that dies right away would otherwise be forked in a tight loop
+            if time.monotonic() - started_at < RESPAWN_BACKOFF_SECONDS:
+                time.sleep(RESPAWN_BACKOFF_SECONDS)
+            self._spawn(index)
+
+    def _shutdown(self):
+        print("Stopping workers...")
+        for pid in self._pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self._pids):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self._pids.clear()
+        self.socket.close()
+        os.unlink(self.control_log)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API on pre-forked workers sharing one model")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--log-level', default='info')
+    parser.add_argument('--memory-interval', type=float, default=0.0,
+                        help="Print per-worker memory every N seconds (0: only on SIGUSR1)")
+    args = parser.parse_args()
+
+    # Everything expensive (model, feature spec, services) loads here, once
+    from app.main import app
+
+    PreforkServer(app, args.host, args.port, args.workers, args.log_level).run(args.memory_interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Shared test setup: run from the backend directory, as the app expects
+"""
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+# The app resolves app/models and data/ relative to the working directory
+os.chdir(BACKEND_DIR)
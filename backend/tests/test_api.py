@@ -0,0 +1,46 @@
+"""
+API tests through FastAPI's TestClient
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.main import app
+from data_generator import SQLInjectionDataGenerator
+from app.services.ml_detector import MLDetector
+
+@pytest.fixture(scope='module')
+def trained_model():
+    """A small model, for trees without app/models/rf_detector.forest"""
+    if routes.ml_detector.model is not None:
+        return
+    generator = SQLInjectionDataGenerator()
+    df = generator.generate_dataset(num_samples=300)
+    detector = MLDetector()
+    detector.train(df[generator.feature_extractor.feature_names].values, df['label'].values)
+    routes.ml_detector.use_model(detector.model, detector.feature_spec_hash)
+
+@pytest.fixture
+def fresh_database(tmp_path, monkeypatch, trained_model):
+    """Point the app at an empty database in tmp_path"""
+    monkeypatch.setattr(routes.database, 'db_path', str(tmp_path / 'knowledge_base.db'))
+
+def test_detect_in_sync_write_mode(fresh_database, monkeypatch):
+    """'sync' mode inserts before responding"""
+    monkeypatch.setattr(routes.knowledge_base, 'write_mode', 'sync')
+
+    with TestClient(app) as client:
+        response = client.post('/api/detect', json={'query': "' OR '1'='1"})
+        assert response.status_code == 200
+
+        history = client.get('/api/attacks').json()
+        assert [attack['query'] for attack in history] == ["' OR '1'='1"]
+
+def test_attacks_page_limit_is_clamped_and_cursor_exposed(fresh_database):
+    """Limits over the page size still work, and browsers may read the cursor"""
+    with TestClient(app) as client:
+        response = client.get(
+            '/api/attacks', params={'limit': 5000}, headers={'Origin': 'http://localhost:3000'}
+        )
+        assert response.status_code == 200
+        assert 'X-Next-Before-Id' in response.headers['access-control-expose-headers']
@@ -0,0 +1,139 @@
+"""
+WebSocket fan-out tests, with in-memory sockets
+"""
+import asyncio
+import json
+
+from app.services.broadcaster import Broadcaster
+from app.services.live_stats import LiveStatsPublisher
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        pass
+
+class StaticKnowledgeBase:
+    async def get_statistics(self):
+        return {'total_queries': 1}
+
+    async def analyze_patterns(self, stats=None):
+        return {'threat_level': 'LOW'}
+
+    async def get_timeline(self, hours=24, bucket='hour'):
+        return [{'bucket': '2026-01-01T00:00:00Z', 'count': 1, 'malicious_count': 0}]
+
+def test_snapshot_respects_stats_subscription():
+    async def scenario():
+        broadcaster = Broadcaster()
+        live_stats = LiveStatsPublisher(StaticKnowledgeBase(), broadcaster)
+        subscribed, unsubscribed = FakeWebSocket(), FakeWebSocket()
+        for websocket in (subscribed, unsubscribed):
+            await broadcaster.connect(websocket)
+        broadcaster.subscribe(unsubscribed, topics=['attacks'])
+
+        for websocket in (subscribed, unsubscribed):
+            await live_stats.send_snapshot(websocket)
+        await asyncio.sleep(0)
+        await broadcaster.close()
+        return subscribed.sent, unsubscribed.sent
+
+    subscribed, unsubscribed = asyncio.run(scenario())
+    assert [message['data']['full'] for message in subscribed] == [True]
+    assert unsubscribed == []
+
+# (topics, attack_types, min_confidence, source_ip_prefix, sample_rate)
+SUBSCRIPTIONS = [
+    (['attacks', 'stats'], None, 0.0, '', 1.0),
+    (['attacks'], ['union_based'], 0.0, '', 1.0),
+    (['attacks'], ['union_based', 'time_based'], 0.5, '10.0.', 1.0),
+    (['attacks'], None, 0.0, '10.0.0.2', 1.0),
+    (['attacks'], None, 0.8, '192.168.', 1.0),
+    (['attacks'], ['boolean_based'], 0.0, '', 0.5),
+    (['attacks'], None, 0.0, '10.', 0.25),
+    (['stats'], None, 0.0, '', 1.0),
+]
+
+EVENTS = [
+    (attack_type, confidence, source_ip)
+    for attack_type in ('union_based', 'boolean_based', 'time_based', None)
+    for confidence in (0.3, 0.6, 0.9)
+    for source_ip in ('10.0.0.2', '10.0.1.7', '192.168.1.1', None)
+]
+
+async def drain(broadcaster: Broadcaster, count: int):
+    """Let the writer tasks run until count messages have been sent"""
+    for _ in range(100 * count + 10):
+        if broadcaster.get_stats()['sent'] >= count:
+            return
+        await asyncio.sleep(0)
+
+def expected_deliveries(subscription, events):
+    """Brute-force reference for publish_attack: every filter checked per event"""
+    topics, attack_types, min_confidence, prefix, sample_rate = subscription
+    delivered, credit = [], 0.0
+    for index, (attack_type, confidence, source_ip) in enumerate(events):
+        if 'attacks' not in topics:
+            continue
+        if attack_types is not None and attack_type not in attack_types:
+            continue
+        if confidence < min_confidence or not (source_ip or '').startswith(prefix):
+            continue
+        if sample_rate < 1.0:
+            credit += sample_rate
+            if credit < 1.0:
+                continue
+            credit -= 1.0
+        delivered.append(index)
+    return delivered
+
+def test_publish_attack_matches_filters():
+    """Indexed matching delivers exactly what a per-client filter would"""
+    expected = [expected_deliveries(subscription, EVENTS) for subscription in SUBSCRIPTIONS]
+
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=len(EVENTS))
+        websockets = [FakeWebSocket() for _ in SUBSCRIPTIONS]
+        for websocket, (topics, attack_types, min_confidence, prefix, sample_rate) in zip(
+            websockets, SUBSCRIPTIONS
+        ):
+            await broadcaster.connect(websocket)
+            broadcaster.subscribe(websocket, topics, attack_types, min_confidence, prefix, sample_rate)
+
+        for index, (attack_type, confidence, source_ip) in enumerate(EVENTS):
+            broadcaster.publish_attack({'index': index}, attack_type, confidence, source_ip)
+        await drain(broadcaster, sum(map(len, expected)))
+        stats = (broadcaster.events, broadcaster.filtered)
+        await broadcaster.close()
+        return [[message['index'] for message in websocket.sent] for websocket in websockets], stats
+
+    received, (events, filtered) = asyncio.run(scenario())
+    assert received == expected
+    assert events == len(EVENTS)
+    assert filtered == len(EVENTS) * len(SUBSCRIPTIONS) - sum(map(len, expected))
+
+def test_resubscribe_replaces_attack_filters():
+    """A new subscription drops the client from the indices of the old one"""
+    async def scenario():
+        broadcaster = Broadcaster()
+        websocket = FakeWebSocket()
+        await broadcaster.connect(websocket)
+        broadcaster.subscribe(websocket, ['attacks'], ['union_based'], source_ip_prefix='10.')
+        broadcaster.publish_attack({'index': 0}, 'union_based', 0.9, '10.0.0.1')
+        broadcaster.subscribe(websocket, ['attacks'], ['time_based'], source_ip_prefix='192.')
+        broadcaster.publish_attack({'index': 1}, 'union_based', 0.9, '10.0.0.1')
+        broadcaster.publish_attack({'index': 2}, 'time_based', 0.9, '192.168.0.1')
+        broadcaster.subscribe(websocket, ['stats'])
+        broadcaster.publish_attack({'index': 3}, 'time_based', 0.9, '192.168.0.1')
+        await drain(broadcaster, 3)
+        await broadcaster.close()
+        return [message['index'] for message in websocket.sent]
+
+    assert asyncio.run(scenario()) == [0, 2]
@@ -0,0 +1,67 @@
+"""
+Compiled forest tests: must reproduce scikit-learn exactly
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from app.services.compiled_forest import CompiledForest
+
+@pytest.fixture(scope='module')
+def dataset():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 12)).astype(np.float32)
+    # Repeated values, so rows fall exactly on split thresholds as counts do
+    X[:, :4] = np.round(X[:, :4] * 4)
+    y = ((X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=600)) > 0).astype(int)
+    labels = np.array(['union_based', 'error_based', 'time_based'])[(X[:, 3] > 0).astype(int) + (X[:, 4] > 1).astype(int)]
+    return X, y, labels
+
+def test_matches_sklearn_binary(dataset):
+    X, y, _ = dataset
+    model = RandomForestClassifier(n_estimators=25, max_depth=10, random_state=0).fit(X[:400], y[:400])
+    compiled = CompiledForest.from_sklearn(model)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X[400:]), model.predict_proba(X[400:]))
+    np.testing.assert_array_equal(compiled.predict(X[400:]), model.predict(X[400:]))
+    # Leaves are numbered across the flattened forest; per tree they match
+    np.testing.assert_array_equal(compiled.apply(X[400:]) - compiled.roots, model.apply(X[400:]))
+
+def test_matches_sklearn_multiclass_labels(dataset):
+    X, _, labels = dataset
+    model = RandomForestClassifier(n_estimators=15, random_state=1).fit(X[:400], labels[:400])
+    compiled = CompiledForest.from_sklearn(model)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X[400:]), model.predict_proba(X[400:]))
+    assert compiled.predict(X[400:]).tolist() == model.predict(X[400:]).tolist()
+
+def test_artifact_round_trip(dataset, tmp_path):
+    """A .forest file maps back to a forest with identical predictions"""
+    from app.services import model_artifact
+    from app.services.ml_detector import MLDetector
+
+    X, y, labels = dataset
+    detector = MLDetector()
+    detector.model = RandomForestClassifier(n_estimators=20, random_state=2).fit(X[:400], y[:400])
+    detector.attack_type_model = RandomForestClassifier(n_estimators=10, random_state=3).fit(X[:400], labels[:400])
+    path = str(tmp_path / 'rf_detector.forest')
+    detector.save_compiled_model(path)
+
+    heads, metadata = model_artifact.read_artifact(path)
+    assert all(isinstance(array, np.ndarray) for arrays in heads.values() for array in arrays.values())
+    forest = CompiledForest.from_arrays(heads['detector'], metadata)
+    np.testing.assert_array_equal(forest.predict_proba(X[400:]), detector.model.predict_proba(X[400:]))
+
+    loaded = MLDetector(model_path=path)
+    np.testing.assert_array_equal(
+        loaded.predict_many(X[400:])[1], detector.predict_many(X[400:])[1]
+    )
+    assert loaded.identify_attack_types(['q'] * 200, X[400:]) == detector.attack_type_model.predict(X[400:]).tolist()
+
+def test_artifact_rejects_other_files(tmp_path):
+    from app.services import model_artifact
+
+    path = tmp_path / 'rf_detector.forest'
+    path.write_bytes(b'\x80\x04not a forest' + bytes(32))
+    with pytest.raises(ValueError):
+        model_artifact.read_artifact(str(path))
@@ -0,0 +1,35 @@
+"""
+Control channel tests: entries are written as another worker would
+"""
+import asyncio
+import json
+import os
+
+from app.services.control import ControlChannel
+
+def test_applies_other_workers_entries_once(tmp_path):
+    log_path = tmp_path / 'control.jsonl'
+    entries = [
+        {'action': 'cache_clear', 'origin': os.getpid() + 1},
+        {'action': 'cache_clear', 'origin': os.getpid()},  # published by this worker
+        {'action': 'model_reload', 'origin': os.getpid() + 1, 'path': 'app/models/a.forest'},
+    ]
+    log_path.write_text(''.join(json.dumps(entry) + '\n' for entry in entries) + '{"action": "cache')
+
+    applied = []
+    async def reload(entry):
+        applied.append(entry['path'])
+
+    channel = ControlChannel()
+    channel.register('cache_clear', lambda entry: applied.append('cleared'))
+    channel.register('model_reload', reload)
+
+    async def scenario():
+        channel.log_path = str(log_path)
+        await channel.apply_pending()
+        # The partial last line is left for the next call
+        await channel.apply_pending()
+
+    asyncio.run(scenario())
+    assert applied == ['cleared', 'app/models/a.forest']
+    assert channel.applied == 2
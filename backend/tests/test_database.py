@@ -0,0 +1,97 @@
+"""
+Database tests, on a fresh file per test
+"""
+import asyncio
+
+import pytest
+
+from app.database.schema import Database
+
+def record(query: str, confidence=0.9) -> dict:
+    return {
+        'query': query,
+        'normalized_query': query,
+        'is_malicious': True,
+        'confidence': confidence,
+        'attack_type': 'union_based',
+    }
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_failed_batch_is_rolled_back(tmp_path):
+    """Rows of a failed batch must not be committed by the next write"""
+    async def scenario():
+        database = Database(str(tmp_path / 'kb.db'), read_pool_size=1)
+        await database.initialize()
+        try:
+            # The second row cannot be bound, after the first was inserted
+            with pytest.raises(Exception):
+                await database.insert_attacks([record('a'), record('b', confidence={})])
+            await database.insert_attack(**record('d'))
+            return [attack['query'] for attack in await database.get_recent_attacks(10)]
+        finally:
+            await database.close()
+
+    assert run(scenario()) == ['d']
+
+def test_failed_retirement_leaves_no_guard(tmp_path):
+    """A retirement that fails midway keeps its rows and the delete triggers armed"""
+    async def scenario():
+        database = Database(str(tmp_path / 'kb.db'), read_pool_size=1)
+        await database.initialize()
+        try:
+            await database.insert_attacks([record('a'), record('b')])
+            # state is NOT NULL: the catalog insert fails after the delete
+            with pytest.raises(Exception):
+                await database.retire_partition('all', 0, 2**62, None)
+            await database.insert_attack(**record('c'))
+
+            queries = [attack['query'] for attack in await database.get_recent_attacks(10)]
+            async with database._reader() as db:
+                async with db.execute("SELECT COUNT(*) FROM retention_guard") as cursor:
+                    guards = (await cursor.fetchone())[0]
+            partition = await database.retire_partition('all', 0, 2**62, 'dropped')
+            stats = await database.get_statistics()
+            return queries, guards, partition['row_count'], stats['total_queries']
+        finally:
+            await database.close()
+
+    queries, guards, retired, total = run(scenario())
+    assert queries == ['c', 'b', 'a']
+    assert guards == 0
+    assert retired == 3
+    # Retention deletes keep counting in the statistics
+    assert total == 3
+
+def test_archive_streams_in_chunks(tmp_path, monkeypatch):
+    """A day archived chunk by chunk reads back whole, in either order"""
+    from app.database import archive
+    from app.services import retention
+    from app.services.retention import RetentionManager
+
+    monkeypatch.setattr(archive, 'ARCHIVE_CHUNK_ROWS', 3)
+    monkeypatch.setattr(retention, 'ARCHIVE_CHUNK_ROWS', 3)
+
+    async def scenario():
+        database = Database(str(tmp_path / 'kb.db'), read_pool_size=1)
+        await database.initialize()
+        try:
+            records = [record(f"select {index} -- é") for index in range(8)]
+            records[2]['source_ip'] = '10.0.0.1'
+            records[5]['response_time_ms'] = 1.5
+            await database.insert_attacks(records)
+            expected = [
+                row async for row in database.iter_partition(0, 2**62, batch_size=3)
+            ]
+
+            manager = RetentionManager(database, archive_dir=str(tmp_path / 'archive'))
+            partition = await manager._retire_day(0, 2**62)
+            return expected, partition
+        finally:
+            await database.close()
+
+    expected, partition = run(scenario())
+    assert partition['row_count'] == 8
+    assert list(archive.read_archive(partition['archive_path'])) == expected
+    assert list(archive.read_archive(partition['archive_path'], newest_first=True)) == expected[::-1]
@@ -0,0 +1,42 @@
+"""
+Detection executor tests in process mode, with a small trained model
+"""
+import asyncio
+
+from data_generator import SQLInjectionDataGenerator
+from app.services.executor import DetectionExecutor
+from app.services.feature_extractor import FeatureExtractor
+from app.services.ml_detector import MLDetector
+from app.services.normalizer import QueryNormalizer
+from app.services.pipeline import DetectionPipeline
+from app.services.verdict_cache import VerdictCache
+
+def test_cleared_cache_misses_in_pool_workers(tmp_path):
+    generator = SQLInjectionDataGenerator()
+    df = generator.generate_dataset(num_samples=200)
+    detector = MLDetector()
+    detector.train(df[generator.feature_extractor.feature_names].values, df['label'].values)
+    model_path = str(tmp_path / 'rf_detector.forest')
+    detector.save_compiled_model(model_path)
+
+    verdict_cache = VerdictCache()
+    pipeline = DetectionPipeline(QueryNormalizer(), FeatureExtractor(), detector, verdict_cache)
+    # One worker, so every task finds the same worker cache
+    executor = DetectionExecutor(pipeline, mode='process', max_workers=1, model_path=model_path)
+
+    async def scenario():
+        query = "' OR '1'='1"
+        cached = [(await executor.analyze(query))['cached'] for _ in range(2)]
+        verdict_cache.invalidate()
+        cached.append((await executor.analyze(query))['cached'])
+        cached += [verdict['cached'] for verdict in await executor.analyze_many([query, 'SELECT 1'])]
+        return cached
+
+    try:
+        cached = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert cached == [False, True, False, True, False]
+    stats = executor.get_cache_stats()
+    assert (stats['scope'], stats['hits'], stats['misses']) == ('workers', 2, 3)
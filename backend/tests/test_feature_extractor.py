@@ -0,0 +1,40 @@
+"""
+Feature extractor tests: counts of the original per-feature str.count() code
+"""
+import numpy as np
+import pytest
+
+from app.services.feature_extractor import FeatureExtractor
+
+@pytest.mark.parametrize('query, nonzero', [
+    ("' UNION SELECT username, password FROM users--", {
+        'length': 46, 'union_count': 1, 'select_count': 1, 'comment_dashes': 1, 'single_quote': 1,
+    }),
+    ("1 or 1=1 and sleep(5) -- ", {
+        'length': 25, 'comment_dashes': 1, 'equals': 1, 'or_keyword': 1, 'and_keyword': 1,
+        'sleep_count': 1,
+    }),
+    (
+        "SELECT @@VERSION, database(), user(), 0x41 FROM information_schema.tables; "
+        "EXEC xp_cmdshell; /* c */ \"x\" CAST(CHAR(65) AS varchar) CONCAT benchmark "
+        "waitfor update insert delete drop execute",
+        {
+            'length': 189, 'select_count': 1, 'insert_count': 1, 'update_count': 1,
+            'delete_count': 1, 'drop_count': 1, 'exec_count': 2, 'execute_count': 1,
+            'concat_count': 1, 'cast_count': 1, 'char_count': 2, 'comment_slash_star': 1,
+            'double_quote': 2, 'semicolon': 2, 'benchmark_count': 1, 'waitfor_count': 1,
+            'information_schema': 1, 'version_func': 1, 'database_func': 1, 'user_func': 1,
+            'has_hex': 1,
+        },
+    ),
+])
+def test_extract(query, nonzero):
+    extractor = FeatureExtractor()
+    features = extractor.extract(query)
+
+    assert list(features) == extractor.feature_names
+    assert features == {name: nonzero.get(name, 0) for name in extractor.feature_names}
+    # The array paths are the same counts in feature_names order
+    expected_row = [float(features[name]) for name in extractor.feature_names]
+    assert extractor.extract_row(query).tolist() == expected_row
+    np.testing.assert_array_equal(extractor.extract_matrix([query, query]), [expected_row] * 2)
@@ -0,0 +1,102 @@
+"""
+Migration tests: a knowledge base written by the first release, upgraded in place
+"""
+import asyncio
+import sqlite3
+from datetime import datetime, timezone
+
+import migrate_db
+from app.database.migrations import SCHEMA_VERSION
+from app.database.schema import Database
+
+# The attacks table and indexes as the first release created them
+V1_SCHEMA = """
+    CREATE TABLE attacks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        query TEXT NOT NULL,
+        normalized_query TEXT,
+        is_malicious INTEGER NOT NULL,
+        confidence REAL NOT NULL,
+        attack_type TEXT,
+        source_ip TEXT,
+        user_agent TEXT,
+        response_time_ms REAL
+    );
+    CREATE INDEX idx_timestamp ON attacks(timestamp);
+    CREATE INDEX idx_is_malicious ON attacks(is_malicious);
+    CREATE INDEX idx_attack_type ON attacks(attack_type);
+"""
+
+# timestamp, query, is_malicious, confidence, attack_type, source_ip, user_agent
+V1_ROWS = [
+    ('2024-03-01T10:00:00.250000', "SELECT * FROM users WHERE id = 1", 0, 0.1, None, '10.0.0.1', 'curl/8.0'),
+    ('2024-03-01T10:05:00', "' OR 1=1 --", 1, 0.9, 'boolean_based', '10.0.0.2', 'sqlmap/1.7'),
+    ('2024-03-01T11:00:00.5', "' UNION SELECT password FROM users --", 1, 0.7, 'union_based', '10.0.0.2', 'sqlmap/1.7'),
+]
+
+def write_v1(path: str):
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(V1_SCHEMA)
+        conn.executemany("""
+            INSERT INTO attacks (
+                timestamp, query, normalized_query, is_malicious,
+                confidence, attack_type, source_ip, user_agent, response_time_ms
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1.5)
+        """, [(ts, query, query.lower(), *rest) for ts, query, *rest in V1_ROWS])
+        conn.commit()
+    finally:
+        conn.close()
+
+def utc_iso(local_timestamp: str) -> str:
+    """What a v1 local timestamp reads back as after the migration"""
+    return datetime.fromisoformat(local_timestamp).astimezone(timezone.utc).isoformat()
+
+def test_v1_database_migrates_to_current_schema(tmp_path):
+    """Rows, timestamps and aggregates survive the v1 -> v3 upgrade"""
+    path = str(tmp_path / 'kb.db')
+    write_v1(path)
+    assert migrate_db.schema_version(path) == 0
+
+    asyncio.run(migrate_db.migrate(path))
+    assert migrate_db.schema_version(path) == SCHEMA_VERSION
+
+    async def read_back():
+        database = Database(path, read_pool_size=1)
+        await database.initialize()
+        try:
+            attacks = await database.get_recent_attacks(10)
+            stats = await database.get_statistics()
+            # Triggers must be live on the migrated table
+            await database.insert_attack(
+                query="1; DROP TABLE users", normalized_query="1; drop table users",
+                is_malicious=True, confidence=0.8, attack_type='stacked_queries',
+            )
+            return attacks, stats, await database.get_statistics()
+        finally:
+            await database.close()
+
+    attacks, stats, after_insert = asyncio.run(read_back())
+
+    assert [attack['id'] for attack in attacks] == [3, 2, 1]
+    for attack, (ts, query, is_malicious, confidence, attack_type, source_ip, user_agent) in zip(
+        reversed(attacks), V1_ROWS
+    ):
+        assert attack['timestamp'] == utc_iso(ts)
+        assert attack['query'] == query
+        assert attack['normalized_query'] == query.lower()
+        assert attack['is_malicious'] == is_malicious
+        assert attack['confidence'] == confidence
+        assert attack['attack_type'] == attack_type
+        assert attack['source_ip'] == source_ip
+        assert attack['user_agent'] == user_agent
+        assert attack['response_time_ms'] == 1.5
+
+    assert stats['total_queries'] == 3
+    assert stats['malicious_queries'] == 2
+    assert abs(stats['average_confidence'] - 0.8) < 1e-9
+    assert stats['attack_type_distribution'] == {'boolean_based': 1, 'union_based': 1}
+
+    assert after_insert['total_queries'] == 4
+    assert after_insert['attack_type_distribution']['stacked_queries'] == 1
@@ -0,0 +1,79 @@
+"""
+Model registry tests, with models trained on a small generated dataset
+"""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from data_generator import SQLInjectionDataGenerator
+from app.services.feature_extractor import FeatureExtractor
+from app.services.ml_detector import MLDetector
+from app.services.model_registry import ModelRegistry, artifact_version
+
+class RecordingExecutor:
+    """Stands in for a process-mode DetectionExecutor"""
+    mode = 'process'
+
+    def __init__(self):
+        self.loaded = []
+
+    def reload_workers(self, model_path: str):
+        self.loaded.append(model_path)
+
+@pytest.fixture(scope='module')
+def training_data():
+    generator = SQLInjectionDataGenerator()
+    df = generator.generate_dataset(num_samples=200)
+    return df[generator.feature_extractor.feature_names].values, df['label'].values
+
+def save_model(path: Path, training_data, seed: int):
+    X, y = training_data
+    detector = MLDetector()
+    detector.train(X, y)
+    # Different trees, so the two files have different versions
+    detector.model.set_params(random_state=seed).fit(X, y)
+    detector.save_compiled_model(str(path))
+
+def test_process_mode_rollback_reloads_the_previous_file(tmp_path, training_data):
+    """Workers are pointed at a copy of the version being activated, not the overwritten path"""
+    model_path = tmp_path / 'rf_detector.forest'
+    save_model(model_path, training_data, seed=1)
+    first_version = artifact_version(str(model_path))
+
+    detector = MLDetector(model_path=str(model_path))
+    executor = RecordingExecutor()
+    registry = ModelRegistry(
+        detector, FeatureExtractor(), executor=executor,
+        model_path=str(model_path), model_dir=str(tmp_path)
+    )
+
+    save_model(model_path, training_data, seed=2)
+    status = asyncio.run(registry.reload())
+    assert status['active']['version'] != first_version
+
+    status = asyncio.run(registry.rollback())
+    assert status['active']['version'] == first_version
+    assert artifact_version(executor.loaded[-1]) == first_version
+    assert [artifact_version(path) for path in executor.loaded] == [
+        first_version, status['history'][0]['version'], first_version
+    ]
+
+def test_reload_refuses_a_file_that_changed_version(tmp_path, training_data):
+    """A peer worker replaying a reload must not activate different bytes"""
+    model_path = tmp_path / 'rf_detector.forest'
+    save_model(model_path, training_data, seed=1)
+    detector = MLDetector(model_path=str(model_path))
+    registry = ModelRegistry(detector, FeatureExtractor(), model_path=str(model_path), model_dir=str(tmp_path))
+    first_version = registry.active['version']
+
+    save_model(model_path, training_data, seed=2)
+    with pytest.raises(ValueError):
+        asyncio.run(registry.reload(str(model_path), expected_version=first_version))
+    assert registry.active['version'] == first_version
+    assert registry.failures == 1
+
+    status = asyncio.run(registry.reload(str(model_path), expected_version=artifact_version(str(model_path))))
+    with pytest.raises(ValueError):
+        asyncio.run(registry.rollback(expected_version=status['active']['version']))
+    assert asyncio.run(registry.rollback(expected_version=first_version))['active']['version'] == first_version
@@ -0,0 +1,24 @@
+"""
+Normalizer tests: outputs of the original regex-based normalizer
+"""
+import pytest
+
+from app.services.normalizer import QueryNormalizer
+
+@pytest.mark.parametrize('query, expected', [
+    ("SELECT * FROM users WHERE id = 1", "select * from users where id = 1"),
+    ("  admin'--  ", "admin'"),
+    ("%27%20OR%20%271%27%3D%271", "' or '1'='1"),
+    ("%2527%2520UNION%2520SELECT%2520NULL--", "' union select null"),
+    ("SELECT/**/password/*x*/FROM users # trailing", "selectpasswordfrom users"),
+    ("1;\tDROP\nTABLE   users", "1; drop table users"),
+    ("a -- comment\nOR 1=1", "a"),
+    ("x /* y\n -- */ z", "x /* y"),
+    ("/* unterminated comment SELECT 1", "/* unterminated comment select 1"),
+    ("SeLeCt 100%", "select 100%"),
+    ("' AND SLEEP(5) AND '1'='1", "' and sleep(5) and '1'='1"),
+    ("", ""),
+    ("   \n\t ", ""),
+])
+def test_normalize(query, expected):
+    assert QueryNormalizer().normalize(query) == expected
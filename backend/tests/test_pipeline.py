@@ -0,0 +1,39 @@
+"""
+Detection pipeline tests
+"""
+import numpy as np
+
+from app.services.feature_extractor import FeatureExtractor
+from app.services.normalizer import QueryNormalizer
+from app.services.pipeline import DetectionPipeline
+from app.services.verdict_cache import VerdictCache
+
+class ReloadingDetector:
+    """Invalidates the cache mid-prediction, as a model reload would"""
+    active = None
+
+    def __init__(self, cache: VerdictCache):
+        self.cache = cache
+
+    def predict(self, features, active=None):
+        self.cache.invalidate()
+        return True, 0.9
+
+    def predict_many(self, features, active=None):
+        self.cache.invalidate()
+        return np.ones(len(features), dtype=bool), np.full(len(features), 0.9)
+
+    def identify_attack_type(self, query, features, active=None):
+        return 'union_based'
+
+    def identify_attack_types(self, queries, features, active=None):
+        return ['union_based'] * len(queries)
+
+def test_verdicts_from_before_an_invalidation_are_not_cached():
+    cache = VerdictCache()
+    pipeline = DetectionPipeline(QueryNormalizer(), FeatureExtractor(), ReloadingDetector(cache), cache)
+
+    pipeline.analyze("' OR 1=1--")
+    pipeline.analyze_many(["' UNION SELECT 1--", "admin'--"])
+
+    assert cache.get_stats()['size'] == 0
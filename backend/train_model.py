@@ -2,17 +2,27 @@
 Train ML Model Script
 Generates dataset and trains the Random Forest classifier
 """
+import argparse
 import sys
-import numpy as np
 from pathlib import Path
 
 # Add app to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from data_generator import SQLInjectionDataGenerator
+from data_generator import SQLInjectionDataGenerator, DEFAULT_SHARD_SIZE
 from app.services.ml_detector import MLDetector
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset and train the detector")
+    parser.add_argument('--samples', type=int, default=1000, help="Dataset size")
+    parser.add_argument('--workers', type=int, default=None, help="Generator processes (default: CPU count)")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help="Samples per generator shard")
+    parser.add_argument('--seed', type=int, default=None, help="Dataset seed (default: random)")
+    parser.add_argument('--data-dir', default='data', help="Where the dataset is written")
+    parser.add_argument('--max-train-samples', type=int, default=None,
+                        help="Train on a stratified sample of at most this many rows (default: all)")
+    args = parser.parse_args()
+    
     print("="*60)
     print("SQL INJECTION DETECTION - MODEL TRAINING")
     print("="*60)
@@ -21,34 +31,40 @@ def main():
     # Step 1: Generate dataset
     print("Step 1: Generating synthetic dataset...")
     generator = SQLInjectionDataGenerator()
-    df = generator.generate_dataset(num_samples=1000)
-    X, y, feature_columns = generator.save_dataset(df, output_dir='data')
+    generator.write_dataset(
+        args.samples, output_dir=args.data_dir, shard_size=args.shard_size,
+        workers=args.workers, seed=args.seed
+    )
+    # Memory-mapped; training copies only the rows it fits on (see --max-train-samples)
+    X, y, attack_types, attack_type_names = generator.load_dataset(args.data_dir)
     print()
     
     # Step 2: Train model
-    print("Step 2: Training Random Forest classifier...")
+    print("Step 2: Training Random Forest classifier and attack-type head...")
     detector = MLDetector()
-    metrics = detector.train(X, y)
+    metrics = detector.train(
+        X, y, attack_types, attack_type_names, max_train_samples=args.max_train_samples
+    )
     print()
     
     # Step 3: Save model
     print("Step 3: Saving trained model...")
-    model_path = 'app/models/rf_detector.pkl'
-    Path(model_path).parent.mkdir(parents=True, exist_ok=True)
-    detector.save_model(model_path)
+    model_path = 'app/models/rf_detector.forest'
+    detector.save_compiled_model(model_path)
     print()
     
     print("="*60)
     print("TRAINING COMPLETE!")
     print("="*60)
     print(f"Model saved to: {model_path}")
-    print(f"Dataset saved to: data/")
+    print(f"Dataset saved to: {args.data_dir}/")
     print()
     print("Model Performance:")
     print(f"  Accuracy:  {metrics['accuracy']*100:.2f}%")
     print(f"  Precision: {metrics['precision']*100:.2f}%")
     print(f"  Recall:    {metrics['recall']*100:.2f}%")
     print(f"  F1 Score:  {metrics['f1_score']*100:.2f}%")
+    print(f"  Attack type accuracy: {metrics['attack_type_accuracy']*100:.2f}%")
     print()
 
 if __name__ == "__main__":
@@ -1,9 +1,21 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { BarChart, Bar, PieChart, Pie, LineChart, Line, Cell, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import { BarChart3, PieChart as PieChartIcon, TrendingUp, Database } from 'lucide-react';
 import { getStatistics, getTimeline, getAttacks } from '../services/api';
+import { wsService } from '../services/websocket';
 
 const COLORS = ['#3b82f6', '#ef4444', '#10b981', '#f59e0b', '#8b5cf6', '#ec4899'];
+const TIMELINE_HOURS = 24;
+
+// Apply the changed buckets of a stats_update and drop those past the window
+const mergeTimeline = (timeline, changed, full) => {
+  const buckets = new Map(full ? [] : timeline.map((row) => [row.bucket, row]));
+  changed.forEach((row) => buckets.set(row.bucket, row));
+  const since = Date.now() - TIMELINE_HOURS * 3600 * 1000 - 3600 * 1000;
+  return [...buckets.values()]
+    .filter((row) => new Date(row.bucket).getTime() >= since)
+    .sort((a, b) => a.bucket.localeCompare(b.bucket));
+};
 
 const Analytics = () => {
   const [stats, setStats] = useState(null);
@@ -11,18 +23,26 @@ const Analytics = () => {
   const [attacks, setAttacks] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedAttack, setSelectedAttack] = useState(null);
+  // seq of the last stats_update applied, to notice ones dropped on the way
+  const lastSeq = useRef(null);
 
   useEffect(() => {
     loadData();
-    const interval = setInterval(loadData, 30000); // Refresh every 30 seconds
-    return () => clearInterval(interval);
+
+    // Stats and timeline changes arrive as stats_update pushes, so there is no polling
+    wsService.connect();
+    wsService.addListener(handleWebSocketMessage);
+
+    return () => {
+      wsService.removeListener(handleWebSocketMessage);
+    };
   }, []);
 
   const loadData = async () => {
     try {
       const [statsData, timelineData, attacksData] = await Promise.all([
         getStatistics(),
-        getTimeline(24),
+        getTimeline(TIMELINE_HOURS),
         getAttacks(50),
       ]);
       setStats(statsData);
@@ -35,6 +55,30 @@ const Analytics = () => {
     }
   };
 
+  const reloadTimeline = async () => {
+    try {
+      setTimeline(await getTimeline(TIMELINE_HOURS));
+    } catch (error) {
+      console.error('Failed to reload timeline:', error);
+    }
+  };
+
+  const handleWebSocketMessage = (data) => {
+    if (data.type === 'stats_update') {
+      const { seq, full } = data.data;
+      // Deltas only carry changed buckets: after a gap, refetch the whole window
+      const missed = !full && lastSeq.current !== null && seq !== lastSeq.current + 1;
+      lastSeq.current = seq;
+
+      setStats(data.data.stats);
+      if (missed) {
+        reloadTimeline();
+      } else {
+        setTimeline((prev) => mergeTimeline(prev, data.data.timeline, full));
+      }
+    }
+  };
+
   if (loading) {
     return (
       <div className="flex items-center justify-center h-64">
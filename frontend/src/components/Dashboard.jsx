@@ -16,11 +16,8 @@ const Dashboard = () => {
     wsService.connect();
     wsService.addListener(handleWebSocketMessage);
 
-    // Refresh data every 10 seconds
-    const interval = setInterval(loadData, 10000);
-
+    // Later stats arrive as stats_update pushes, so there is no polling
     return () => {
-      clearInterval(interval);
       wsService.removeListener(handleWebSocketMessage);
     };
   }, []);
@@ -46,8 +43,9 @@ const Dashboard = () => {
         { ...data.data, id: Date.now() },
         ...prev.slice(0, 9),
       ]);
-      // Refresh stats
-      loadData();
+    } else if (data.type === 'stats_update') {
+      // Pushed by the server once per tick when something changed
+      setStats(data.data.stats);
     }
   };
 